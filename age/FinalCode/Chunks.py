@@ -0,0 +1,121 @@
+"""
+Chunked world layer for large maps: fixed-size square regions that know which
+units stand in them and whether an engagement is going on around them
+"""
+import math
+from typing import Dict, List, Set, Tuple
+from Units import Unit
+
+Key = Tuple[int, int]
+
+
+class Chunk:
+    __slots__ = ('key', 'units', 'players', 'active')
+
+    def __init__(self, key: Key):
+        self.key = key
+        self.units: Dict[int, Unit] = {}
+        # player -> number of units of that player in the chunk
+        self.players: Dict[int, int] = {}
+        self.active = False
+
+
+class ChunkGrid:
+    """Squares of `size` world units, created when a unit first enters them.
+
+    A chunk is active when two or more players have units in it or in one
+    of its 8 neighbours. With `size` above every unit's reach, nobody in an
+    inactive chunk can hit or be hit this tick. Activity is only recomputed
+    around chunks whose set of players changed.
+    """
+
+    def __init__(self, size: float = 16.0):
+        self.size = size
+        self.chunks: Dict[Key, Chunk] = {}
+        self.unit_chunk: Dict[int, Chunk] = {}
+        self.active: Set[Key] = set()
+        self._dirty: Set[Key] = set()
+
+    def key_of(self, x: float, y: float) -> Key:
+        return (math.floor(x / self.size), math.floor(y / self.size))
+
+    def place(self, u: Unit):
+        """Insert a unit or move it to the chunk its position now falls in."""
+        key = (math.floor(u.x / self.size), math.floor(u.y / self.size))
+        old = self.unit_chunk.get(u.id)
+        if old is not None:
+            if old.key == key:
+                return
+            self._leave(old, u)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = Chunk(key)
+        chunk.units[u.id] = u
+        n = chunk.players.get(u.player, 0)
+        chunk.players[u.player] = n + 1
+        if n == 0:
+            self._dirty.add(key)
+        self.unit_chunk[u.id] = chunk
+
+    def remove(self, u: Unit):
+        chunk = self.unit_chunk.pop(u.id, None)
+        if chunk is not None:
+            self._leave(chunk, u)
+
+    def _leave(self, chunk: Chunk, u: Unit):
+        del chunk.units[u.id]
+        n = chunk.players[u.player] - 1
+        if n:
+            chunk.players[u.player] = n
+        else:
+            del chunk.players[u.player]
+            self._dirty.add(chunk.key)
+        if not chunk.units:
+            del self.chunks[chunk.key]
+            self.active.discard(chunk.key)
+
+    def rebuild(self, units: List[Unit]):
+        self.chunks.clear()
+        self.unit_chunk.clear()
+        self.active.clear()
+        self._dirty.clear()
+        for u in units:
+            if u.alive:
+                self.place(u)
+
+    def is_active(self, u: Unit) -> bool:
+        chunk = self.unit_chunk.get(u.id)
+        return chunk is not None and chunk.active
+
+    def update_activity(self):
+        """Re-evaluate the chunks around those whose players changed."""
+        if not self._dirty:
+            return
+        todo = {(cx + dx, cy + dy) for cx, cy in self._dirty for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+        self._dirty.clear()
+        chunks = self.chunks
+        for key in todo:
+            chunk = chunks.get(key)
+            if chunk is None:
+                continue
+            cx, cy = key
+            seen = set()
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    other = chunks.get((cx + dx, cy + dy))
+                    if other is not None:
+                        seen.update(other.players)
+            chunk.active = len(seen) > 1
+            if chunk.active:
+                self.active.add(key)
+            else:
+                self.active.discard(key)
+
+    def active_units(self) -> List[Unit]:
+        """Units of the active chunks, ordered by id."""
+        units = [u for key in self.active for u in self.chunks[key].units.values()]
+        units.sort(key=lambda u: u.id)
+        return units
+
+    def quiet_chunks(self) -> List[Chunk]:
+        return [c for c in self.chunks.values() if not c.active]
@@ -3,6 +3,7 @@ from Generals import General
 from typing import List, Dict
 import argparse
 from Engine import SimpleEngine
+from Scheduler import SIM_DT
 import time
 def parse_args():
     p = argparse.ArgumentParser(description="Terminal-playable MedievAIl-like simulator")
@@ -12,19 +13,17 @@ def parse_args():
 
 
 def run_headless(engine: SimpleEngine, generals: Dict[int, General], max_ticks=60.0):
-    t=0.0; dt=0.2; step=0; start=time.time()
+    t=0.0; dt=SIM_DT; step=0; start=time.time()
     while t<max_ticks:
         engine.step(dt, generals)
         t+=dt; step+=1
-        p1 = engine.get_units_for_player(1)
-        p2 = engine.get_units_for_player(2)
-        if not p1 or not p2:
-            winner = 2 if p2 else (1 if p1 else 0)
+        if engine.is_finished:
+            winner = engine.winner
             print(f"Battle ended at t={t:.1f}s steps={step}. Winner: P{winner}")
             break
     else:
         print("Battle timed out (draw).")
     print(f"Simulation took {time.time()-start:.2f}s wall time. Engine ticks: {engine.tick:.2f}")
     print("Events:")
-    for e in engine.events[-20:]:
+    for e in engine.events.lines(20):
         print("  ", e)
@@ -224,7 +224,7 @@ class DebugInfoGenerator:
 """
         
         # Show last 50 events
-        recent_events = engine.events[-50:] if len(engine.events) > 50 else engine.events
+        recent_events = engine.events.lines(50)
         for event in reversed(recent_events):
             html += f'        <div class="event">{event}</div>\n'
         
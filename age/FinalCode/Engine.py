@@ -1,39 +1,917 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
+import math
+import time
+from operator import attrgetter
 from Map import MAP_W, MAP_H
 from Units import Unit
 from Generals import General
-from typing import List, Dict
+from SpatialHash import SpatialHash
+from Separation import separate_units, overlapping_pairs
+from Scheduler import TimingWheel
+from EventLog import EventLog, EVENT_DEATH
+from StepProfile import StepProfile
+from Chunks import ChunkGrid
+from UnitSlots import UnitSlots, fresh_id
+from Perception import Perception
+from UnitTypes import TYPES, MONK, get_type
+from typing import List, Dict, NamedTuple, Optional, Tuple, Union
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Unit slots a battle changes, and the rest (stats, identity): each read in one C-level call
+UNIT_STATE = ('x', 'y', 'hp', 'alive', 'target_id', 'reload_timer', 'last_x', 'last_y')
+UNIT_STATS = tuple(f.name for f in fields(Unit) if f.name not in UNIT_STATE)
+_unit_state = attrgetter(*UNIT_STATE)
+_unit_stats = attrgetter(*UNIT_STATS)
+# Most ticks SimpleEngine.warp waits between two tries that skip nothing
+WARP_BACKOFF = 32
+
+
+class EngineSnapshot(NamedTuple):
+    """In-memory copy of a SimpleEngine's battle state (see SimpleEngine.snapshot)."""
+    tick: float
+    steps: int
+    next_unit_id: int
+    events_total: int
+    # (unit, UNIT_STATE values, UNIT_STATS values) for every live unit, in `units` order
+    units: Tuple[Tuple[Unit, tuple, tuple], ...]
+
+
 @dataclass
 class SimpleEngine:
     w: int = MAP_W
     h: int = MAP_H
     units: List[Unit] = field(default_factory=list)
-    units_by_id: Dict[int, Unit] = field(default_factory=dict)
+    # Live units by id; an id packs a dense slot and its generation (see UnitSlots)
+    units_by_id: UnitSlots = field(default_factory=UnitSlots)
     next_unit_id: int = 1
     tick: float = 0.0
-    events: List[str] = field(default_factory=list)
+    events: EventLog = field(default_factory=EventLog)
+    grid: SpatialHash = field(default_factory=SpatialHash)
+    # Live units per player and per (player, type code), in spawn order
+    units_by_player: Dict[int, List[Unit]] = field(default_factory=dict)
+    units_by_type: Dict[Tuple[int, int], List[Unit]] = field(default_factory=dict)
+    # Live units per player, kept up to date on spawn and death
+    alive_counts: Dict[int, int] = field(default_factory=dict)
+    # "per_unit": Unit.handle_collisions inside each step; "batched": one NumPy pass per tick
+    collisions: str = "per_unit"
+    # Units marked dead since the last compaction of `units`
+    dead_pending: int = 0
+    # "per_tick": every unit runs its full step each tick; "wheel": units in range
+    # of their target wait on `attack_wheel` until their reload expires
+    scheduling: str = "per_tick"
+    attack_wheel: TimingWheel = field(default_factory=TimingWheel)
+    # Units waiting on the wheel, by id (see _engage)
+    engaged: Dict[int, list] = field(default_factory=dict)
+    # Idle units with no enemy within `sleep_radius` skip their step until an order,
+    # a hit, a push or an approaching enemy wakes them: id -> (x, y, hp) when they fell asleep
+    sleep_idle: bool = False
+    sleep_radius: float = 6.0
+    sleeping: Dict[int, Tuple[float, float, float]] = field(default_factory=dict)
+    # Grid cell -> number of sleepers within reach of it
+    sleep_zone: Dict[Tuple[int, int], int] = field(default_factory=dict)
+    # Per player, units that took damage and may be below max hp (pruned on query)
+    wounded: Dict[int, Dict[int, Unit]] = field(default_factory=dict)
+    steps: int = 0
+    # Set to a StepProfile to time every phase of `step` and count hot-path work
+    profile: Optional[StepProfile] = None
+    # > 0: chunked world of that chunk size; units away from any engagement
+    # skip collisions and idle ones skip their step (see _step_chunked).
+    # Cannot be combined with scheduling="wheel", lod_every or sleep_idle
+    chunk_size: float = 0.0
+    chunks: Optional[ChunkGrid] = None
+    # "immediate": a hit lands inside the attacker's step; "two_phase": hits are
+    # buffered in `hits` as (attacker, target, damage) and applied after the unit pass
+    combat: str = "immediate"
+    hits: List[Tuple[Unit, Unit, float]] = field(default_factory=list)
+    # Multi-rate stepping (lod_every > 1): settled units with no target whose chunk
+    # of size `lod_radius` is quiet step one tick in lod_every with the elapsed
+    # time (see _step_lod); id -> tick of their last step
+    lod_every: int = 1
+    lod_radius: float = 12.0
+    lod_far: Dict[int, float] = field(default_factory=dict)
+    # Quiet units a neighbour moved into: id -> tick of their last step
+    lod_woken: Dict[int, float] = field(default_factory=dict)
+    # Generals' shared view of the current tick, see `perception`
+    _perception: Optional[Perception] = field(default=None, repr=False)
+    # Ticks `warp` lets pass before trying again, after tries that skipped nothing
+    _warp_wait: int = field(default=0, repr=False)
+    _warp_backoff: int = field(default=1, repr=False)
 
     def spawn_unit(self, player: int, x: float, y: float, **kwargs) -> Unit:
-        u = Unit(id=self.next_unit_id, player=player, x=x, y=y, **kwargs)
+        """Create a unit with its type's registered stats; kwargs override them."""
+        stats = get_type(kwargs.get('unit_type', "Pikeman")).stats()
+        stats.update(kwargs)
+        uid = self.units_by_id.free_id()
+        if uid is None:
+            uid = fresh_id(self.next_unit_id)
+            self.next_unit_id += 1
+        u = Unit(id=uid, player=player, x=x, y=y, **stats)
         # Ensure hp default if not passed
         if u.hp == 0.0:
             u.hp = kwargs.get('hp', 55)
-        self.next_unit_id += 1
         self.units.append(u)
         self.units_by_id[u.id] = u
+        self._index(u)
+        self._perception = None
+        self.grid.insert(u)
+        if self.sleep_zone:
+            self._moved(u)
+        if self.chunks is not None:
+            self.chunks.place(u)
         return u
 
+    def spawn_units(self, player: int, xs, ys, unit_type: str = "Pikeman", **kwargs) -> List[Unit]:
+        """Spawn one unit of `unit_type` at each (xs[i], ys[i]) (lists or arrays,
+        see Formations). Same ids, order and indexes as that many spawn_unit
+        calls, with the type lookup and the index upkeep done once."""
+        utype = get_type(unit_type)
+        stats = utype.stats()
+        stats.update(kwargs)
+        # Le code, déjà résolu : __post_init__ n'a plus de nom à chercher
+        stats['unit_type'] = utype.code
+        if hasattr(xs, 'tolist'):
+            xs, ys = xs.tolist(), ys.tolist()
+        by_id = self.units_by_id
+        new = []
+        for x, y in zip(xs, ys):
+            uid = by_id.free_id() if by_id.free else None
+            if uid is None:
+                uid = fresh_id(self.next_unit_id)
+                self.next_unit_id += 1
+            u = Unit(id=uid, player=player, x=x, y=y, **stats)
+            if u.hp == 0.0:
+                u.hp = kwargs.get('hp', 55)
+            new.append(u)
+        if not new:
+            return new
+
+        self.units.extend(new)
+        self._perception = None
+        by_id.add_all(new)
+        self.grid.insert_many(new)
+        self.alive_counts[player] = self.alive_counts.get(player, 0) + len(new)
+        self.units_by_player.setdefault(player, []).extend(new)
+        self.units_by_type.setdefault((player, new[0].type_code), []).extend(new)
+        for u in new:
+            if u.hp < u.max_hp:
+                self.note_damage(u)
+            if self.sleep_zone:
+                self._moved(u)
+            if self.chunks is not None:
+                self.chunks.place(u)
+        return new
+
+    def _index(self, u: Unit):
+        self.alive_counts[u.player] = self.alive_counts.get(u.player, 0) + 1
+        self.units_by_player.setdefault(u.player, []).append(u)
+        self.units_by_type.setdefault((u.player, u.type_code), []).append(u)
+        if u.hp < u.max_hp:
+            self.note_damage(u)
+
+    def reindex(self, rebuild_grid: bool = True):
+        """Rebuild every index from `units` after it was edited by hand (load, plot).
+
+        With rebuild_grid=False units already in the grid are only re-bucketed.
+        """
+        self.units_by_id.reset(u for u in self.units if u.alive)
+        self._perception = None
+        self.units_by_player.clear()
+        self.units_by_type.clear()
+        self.alive_counts.clear()
+        self.wounded.clear()
+        for u in self.units:
+            if u.alive:
+                self._index(u)
+        self.dead_pending = sum(1 for u in self.units if not u.alive)
+        if rebuild_grid:
+            self.grid.rebuild(self.units)
+        else:
+            self.grid.refresh(self.units)
+        self.engaged.clear()
+        self.attack_wheel.clear()
+        self.sleeping.clear()
+        self.sleep_zone.clear()
+        self.chunks = None
+        self.hits.clear()
+        self.lod_far.clear()
+        self.lod_woken.clear()
+
+    def snapshot(self) -> EngineSnapshot:
+        """Copy the battle state so it can be rewound with `restore`.
+
+        Only field values are copied, the Unit objects themselves are kept:
+        restoring writes the values back into the same objects, so references
+        held by generals stay valid. Generals' own memory is not included.
+        """
+        return EngineSnapshot(self.tick, self.steps, self.next_unit_id, self.events.total,
+                              tuple([(u, _unit_state(u), _unit_stats(u)) for u in self.units if u.alive]))
+
+    def restore(self, snap: EngineSnapshot):
+        """Rewind to a snapshot taken from this engine; units spawned since are
+        dropped and events logged since are forgotten."""
+        self.tick, self.steps, self.next_unit_id = snap.tick, snap.steps, snap.next_unit_id
+        self.events.truncate(snap.events_total)
+        units = [u for u, _, _ in snap.units]
+        kept = set(map(id, units))
+        for u in self.units:
+            if id(u) not in kept:
+                self.grid.remove(u)
+        for u, state, stats in snap.units:
+            if _unit_state(u) != state:
+                u.x, u.y, u.hp, u.alive, u.target_id, u.reload_timer, u.last_x, u.last_y = state
+            if _unit_stats(u) != stats:
+                for name, value in zip(UNIT_STATS, stats):
+                    setattr(u, name, value)
+        self.units = units
+        self.reindex(rebuild_grid=False)
+
     def step(self, dt: float, generals: Dict[int, "General"]):
+        if self.profile is not None:
+            self._step_profiled(dt, generals, self.profile)
+            return
         self.tick += dt
+        self.steps += 1
         for pid, gen in generals.items():
             gen.give_orders(self)
-        for u in list(self.units):
+        # Generals may have moved units directly: re-bucket before the unit pass
+        moved = self.grid.refresh(self.units)
+        if self.collisions == "batched":
+            for u in separate_units(self.units):
+                if self.grid.update(u):
+                    moved.append(u)
+        if self.sleep_zone:
+            for u in moved:
+                self._moved(u)
+        self._unit_pass(dt, moved)
+        if self.hits:
+            self._resolve_hits()
+        if self.dead_pending:
+            self.compact()
+
+    def warp(self, dt: float, generals: Dict[int, "General"], max_steps: int) -> int:
+        """Fast-forward the approach phase of a headless battle.
+
+        While no two enemies can get within attack range, or within the
+        `engage_radius` of a general, the generals give their orders once and
+        the units replay what `act` does out of range, tick by tick and in
+        order: reload, regen, and one step towards the target's current
+        position. Units with nothing to do are left out. The collision pass
+        is skipped, which changes nothing as long as it would push nobody:
+        with NumPy every replayed tick is checked for the overlaps that pass
+        could see, and the warp stops before the first tick where it would
+        have had work (without NumPy the closest two units cap the warp
+        beforehand). So the battle ends exactly as without the warp.
+
+        Only generals with `steady_approach` (every tick would give the same
+        orders) allow a warp, and neither the chunked world nor multi-rate
+        stepping does (their unit pass visits units in another order). The
+        number of ticks comes from the bounding-box gap between the armies
+        over their combined top speed. Returns the number of ticks skipped,
+        0 when the armies are too close, up to `max_steps`. After a try that
+        skipped nothing, the next ones wait 1, 2, 4... up to WARP_BACKOFF
+        ticks, so a battle past its approach pays little for them.
+        """
+        if self.chunk_size > 0 or self.lod_every > 1:
+            return 0
+        if not all(gen.steady_approach for gen in generals.values()):
+            return 0
+        if self._warp_wait > 0:
+            self._warp_wait -= 1
+            return 0
+        engage = max((gen.engage_radius for gen in generals.values()), default=0.0)
+        n = self._warp_ticks(dt, max_steps, engage)
+        if n < 2:
+            self._warp_failed()
+            return 0
+        # Same tick as the last step, but the units have moved since
+        self._perception = None
+        for pid, gen in generals.items():
+            gen.give_orders(self)
+        # Orders may have changed the picture (generals can move units)
+        n = self._warp_ticks(dt, n, engage)
+        if n < 2:
+            # Plain tick, the generals already spoke for it
+            self._warp_failed()
+            self.step(dt, {})
+            return 1
+        live = [u for u in self.units if u.alive]
+        busy = [u for u in live if u.target_id is not None or u.regen > 0 or u.reload_timer > 0]
+        by_id = self.units_by_id
+        if np is not None:
+            radius = np.fromiter((u.radius for u in live), dtype=np.float64, count=len(live))
+            before = self._positions(live)
+        done = 0
+        while done < n:
+            if np is not None:
+                saved = [(u.x, u.y, u.hp, u.reload_timer, u.target_id) for u in busy]
+            for u in busy:
+                if u.reload_timer > 0:
+                    u.reload_timer -= dt
+                if u.regen > 0:
+                    u.hp = min(u.hp + u.regen * dt, u.max_hp)
+                # Monks: nobody of theirs is wounded, there is no one to heal
+                if u.type_code == MONK or u.target_id is None:
+                    continue
+                target = by_id.get(u.target_id)
+                if target is None or not target.alive:
+                    u.target_id = None
+                    continue
+                u.move_towards(target, dt)
+            if np is not None:
+                after = self._positions(live)
+                if self._would_push(before, after, radius):
+                    # The collision pass had work this tick: undo it, step it for real
+                    for u, state in zip(busy, saved):
+                        u.x, u.y, u.hp, u.reload_timer, u.target_id = state
+                    break
+                before = after
+            self.tick += dt
+            done += 1
+        if done == 0:
+            self._warp_failed()
+            self.step(dt, {})
+            return 1
+        self._warp_backoff = 1
+        self.steps += done
+        # Everyone moved behind the grid and sleep zones' backs
+        self.grid.refresh(self.units)
+        self.sleeping.clear()
+        self.sleep_zone.clear()
+        return done
+
+    def _warp_failed(self):
+        self._warp_wait = self._warp_backoff
+        self._warp_backoff = min(2 * self._warp_backoff, WARP_BACKOFF)
+
+    def _warp_ticks(self, dt: float, limit: int, engage: float = 0.0) -> int:
+        """Ticks that can pass before any two enemies could come within range
+        or within `engage` of each other (and, without NumPy, before any two
+        units could touch: warp checks the replayed ticks otherwise)."""
+        if limit < 2 or self.engaged or self.hits:
+            return 0
+        boxes = {}
+        reach = engage
+        speed = {}
+        healers = set()
+        wounded = set()
+        for u in self.units:
+            if not u.alive:
+                continue
+            p = u.player
+            box = boxes.get(p)
+            if box is None:
+                boxes[p] = [u.x, u.y, u.x, u.y]
+            else:
+                if u.x < box[0]:
+                    box[0] = u.x
+                elif u.x > box[2]:
+                    box[2] = u.x
+                if u.y < box[1]:
+                    box[1] = u.y
+                elif u.y > box[3]:
+                    box[3] = u.y
+            if u.speed > speed.get(p, 0.0):
+                speed[p] = u.speed
+            if TYPES[u.type_code].healer:
+                healers.add(p)
+            else:
+                reach = max(reach, u.range + 0.2)
+            if u.hp < u.max_hp:
+                wounded.add(p)
+        if len(boxes) < 2 or healers & wounded:
+            return 0
+        best = math.inf
+        players = list(boxes)
+        for i, p in enumerate(players):
+            a = boxes[p]
+            for q in players[i + 1:]:
+                b = boxes[q]
+                gap = math.hypot(max(0.0, b[0] - a[2], a[0] - b[2]), max(0.0, b[1] - a[3], a[1] - b[3]))
+                closing = speed.get(p, 0.0) + speed.get(q, 0.0)
+                if closing > 0:
+                    best = min(best, (gap - reach) / (closing * dt))
+        if best != math.inf:
+            # One tick of margin for the float rounding of positions
+            limit = max(0, min(limit, int(best) - 1))
+        if limit < 2:
+            return 0
+        if np is not None:
+            return limit
+        return self._apart_ticks(dt, limit)
+
+    @staticmethod
+    def _positions(units: List[Unit]) -> tuple:
+        n = len(units)
+        return (np.fromiter((u.x for u in units), dtype=np.float64, count=n),
+                np.fromiter((u.y for u in units), dtype=np.float64, count=n))
+
+    @staticmethod
+    def _would_push(before: tuple, after: tuple, radius) -> bool:
+        """True if the collision pass of a tick taking the units from `before`
+        to `after` positions could push someone: two units overlap with each
+        at either end of its move (units move one after the other)."""
+        n = len(radius)
+        x = np.concatenate((before[0], after[0]))
+        y = np.concatenate((before[1], after[1]))
+        # Float rounding of the distances: err towards overlapping
+        r = np.concatenate((radius, radius)) + 1e-9
+        i, j = overlapping_pairs(x, y, r)
+        return bool(np.any(i % n != j % n))
+
+    def _apart_ticks(self, dt: float, limit: int) -> int:
+        """Ticks (up to `limit`, 0 below 2) before any two units could come
+        within 2 * max radius of each other. Only units with a target move
+        during a warp."""
+        top_speed = max((u.speed for u in self.units
+                         if u.alive and u.target_id is not None and u.type_code != MONK), default=0.0)
+        touch = 2 * self.grid.max_radius
+        closing = 2 * top_speed * dt
+        # Only pairs closer than this can cut the warp short
+        reach = touch + closing * (limit + 1)
+        nearest = self.grid.nearest
+        for u in self.units:
+            if not u.alive:
+                continue
+            uid = u.id
+            found = nearest(u.x, u.y, predicate=lambda v: v.id != uid, max_dist=reach)
+            if found:
+                gap = u.distance_to(found[0]) - touch
+                if gap < 0:
+                    # Already pushing each other
+                    return 0
+                if closing > 0:
+                    # One tick of margin, as for the armies
+                    limit = min(limit, math.floor(gap / closing) - 1)
+                    if limit < 2:
+                        return 0
+                    reach = touch + closing * (limit + 1)
+        return limit
+
+    def _unit_pass(self, dt: float, moved: List[Unit]):
+        if self.scheduling == "wheel":
+            self._step_scheduled(dt)
+        elif self.chunk_size > 0:
+            self._step_chunked(dt, moved)
+        elif self.lod_every > 1:
+            self._step_lod(dt, moved)
+        elif self.sleep_idle:
+            for u in self.units:
+                if u.alive:
+                    if u.id in self.sleeping and self._dozing(u):
+                        continue
+                    u.step(dt, self)
+                    if u.alive:
+                        self._settle(u)
+        else:
+            for u in self.units:
+                if u.alive:
+                    u.step(dt, self)
+                    if u.alive:
+                        self.grid.update(u)
+
+    def _step_profiled(self, dt: float, generals: Dict[int, "General"], prof: StepProfile):
+        """`step` with every phase timed into `prof`; same outcome."""
+        clock = time.perf_counter
+        prof.begin_tick(self.tick + dt)
+        deaths = self.events.total
+        self.grid.profile = prof
+        self.tick += dt
+        self.steps += 1
+        t = clock()
+        for pid, gen in generals.items():
+            gen.give_orders(self)
+            now = clock()
+            prof.add_general(pid, now - t)
+            prof.add('generals', now - t)
+            t = now
+        moved = self.grid.refresh(self.units)
+        now = clock()
+        prof.add('grid', now - t)
+        t = now
+        if self.collisions == "batched":
+            for u in separate_units(self.units, prof):
+                if self.grid.update(u):
+                    moved.append(u)
+            now = clock()
+            prof.add('collisions', now - t)
+            t = now
+        if self.sleep_zone:
+            for u in moved:
+                self._moved(u)
+        if self.scheduling == "wheel" or self.sleep_idle or self.chunk_size > 0 or self.lod_every > 1:
+            self._unit_pass(dt, moved)
+            now = clock()
+            prof.add('units', now - t)
+            t = now
+        else:
+            per_unit = self.collisions == "per_unit"
+            for u in self.units:
+                if u.alive:
+                    if per_unit:
+                        u.handle_collisions(self)
+                        now = clock()
+                        prof.add('collisions', now - t)
+                        t = now
+                    u.act(dt, self)
+                    if u.alive:
+                        self.grid.update(u)
+                    now = clock()
+                    prof.add('monks' if u.type_code == MONK else 'combat', now - t)
+                    t = now
+        if self.hits:
+            self._resolve_hits()
+            now = clock()
+            prof.add('combat', now - t)
+            t = now
+        if self.dead_pending:
+            self.compact()
+        prof.add('compaction', clock() - t)
+        prof.deaths += self.events.total - deaths
+        prof.end_tick()
+        self.grid.profile = None
+
+    def _resolve_hits(self):
+        """Second phase of "two_phase" combat: apply the tick's hits at once.
+
+        Hits are sorted by (target id, attacker id) and summed per target in
+        one reduction, so the outcome does not depend on the order units
+        stepped in. Every unit left at 0 hp dies, credited to its lowest-id
+        attacker; as in VectorEngine, it still landed its own blow this tick.
+        """
+        if np is None:
+            raise RuntimeError("NumPy not installed.")
+        hits = self.hits
+        hits.sort(key=lambda h: (h[1].id, h[0].id))
+        targets, killers, slot = [], [], []
+        for attacker, target, _ in hits:
+            if not targets or targets[-1] is not target:
+                targets.append(target)
+                killers.append(attacker)
+            slot.append(len(targets) - 1)
+        hp = np.fromiter((t.hp for t in targets), dtype=np.float64, count=len(targets))
+        np.subtract.at(hp, np.array(slot), np.fromiter((h[2] for h in hits), dtype=np.float64, count=len(hits)))
+        hits.clear()
+        for target, killer, left in zip(targets, killers, hp.tolist()):
+            if not target.alive:
+                continue
+            target.hp = left
+            if left <= 0:
+                target.alive = False
+                target.hp = 0
+                self.mark_dead(target, killer)
+            else:
+                self.note_damage(target)
+
+    def _step_lod(self, dt: float, moved: List[Unit]):
+        """Unit pass of multi-rate stepping.
+
+        Only quiet units step at the low rate: no target, not a monk, no
+        enemy in the 3x3 chunks of `lod_radius` around them (a ChunkGrid) and
+        not pushed by a neighbour at their last step, so their step is reload
+        and regen. They step one tick in `lod_every`, spread by id, with dt
+        scaled to the time since their last step. A unit that stops being
+        quiet first catches up on the reload and regen it missed, then steps
+        every tick.
+        """
+        chunks = self._chunk_grid(self.lod_radius, moved)
+        k = self.lod_every
+        far = self.lod_far
+        woken = self.lod_woken
+        grid = self.grid
+        for u in self.units:
+            if not u.alive:
+                continue
+            x, y = u.x, u.y
+            last = woken.pop(u.id, None) if woken else None
+            woke = last is not None
+            if not woke:
+                last = far.get(u.id)
+            if woke or u.target_id is not None or u.type_code == MONK or chunks.is_active(u):
+                if last is not None:
+                    far.pop(u.id, None)
+                    self._catch_up(u, self.tick - dt - last)
+                u.step(dt, self)
+            elif last is None or not (self.steps + u.id) % k:
+                u.step(dt if last is None else self.tick - last, self)
+                if (u.x, u.y) == (x, y):
+                    far[u.id] = self.tick
+                else:
+                    # Pushed: steps every tick until it settles
+                    far.pop(u.id, None)
+            else:
+                continue
+            if u.alive:
+                grid.update(u)
+                chunks.place(u)
+                if far and (u.x, u.y) != (x, y):
+                    self._wake_touched(u)
+
+    def _wake_touched(self, u: Unit):
+        """Hand the quiet units `u` now overlaps back to full rate, from their
+        next visit on: they push themselves out at every tick of a full-rate run."""
+        far = self.lod_far
+        for v in self.grid.query_radius(u.x, u.y, u.radius + self.grid.max_radius):
+            if v.id in far and v.distance_to(u) < u.radius + v.radius:
+                self.lod_woken[v.id] = far.pop(v.id)
+
+    @staticmethod
+    def _catch_up(u: Unit, elapsed: float):
+        """Reload and regen of a unit over `elapsed` seconds it was not stepped."""
+        if elapsed <= 0:
+            return
+        if u.reload_timer > 0:
+            u.reload_timer -= elapsed
+        if u.regen > 0:
+            u.hp = min(u.hp + u.regen * elapsed, u.max_hp)
+
+    def _chunk_grid(self, size: float, moved: List[Unit]) -> ChunkGrid:
+        """The world's ChunkGrid, created on first use, with `moved` re-placed
+        and activity up to date."""
+        chunks = self.chunks
+        if chunks is None:
+            chunks = self.chunks = ChunkGrid(size)
+            chunks.rebuild(self.units)
+        else:
+            for u in moved:
+                chunks.place(u)
+        chunks.update_activity()
+        return chunks
+
+    # --------------------------
+    # Chunked world
+    # --------------------------
+    def _step_chunked(self, dt: float, moved: List[Unit]):
+        """Unit pass of the chunked world.
+
+        Units in active chunks step in full. Elsewhere no enemy is within
+        reach, so units only reload, regenerate, heal and walk towards their
+        target, without collisions, and idle units are not visited at all.
+
+        Outcomes drift from the plain loop (no pushes between walkers away
+        from fights). Meant for large maps with a few distant fights: on a
+        2000x2000 map with five 160-unit fights and 2000 idle units, 100
+        ticks take 2.6 s instead of 7.3 s. On the default 120x120 map
+        everything is near a fight and the chunk upkeep makes it slower
+        (square NG2-vs-NG1: 3.6 s instead of 3.0 s).
+        """
+        chunks = self._chunk_grid(self.chunk_size, moved)
+        grid = self.grid
+        # Both lists are taken before anyone moves: a unit walking into another
+        # chunk (or a new one) must not be visited twice
+        active = chunks.active_units()
+        quiet = [u for chunk in chunks.quiet_chunks() for u in chunk.units.values()]
+        for u in active:
             if u.alive:
                 u.step(dt, self)
-        self.units = [u for u in self.units if u.alive]
-        self.units_by_id = {u.id: u for u in self.units}
-    def mark_dead(self, unit: Unit):
-        self.events.append(f"Unit {unit.id} (P{unit.player}) died at tick {self.tick:.2f}")
+                if u.alive:
+                    grid.update(u)
+                    chunks.place(u)
+        for u in quiet:
+            if u.alive and (u.target_id is not None or u.reload_timer > 0 or TYPES[u.type_code].healer
+                            or (u.regen > 0 and u.hp < u.max_hp)):
+                u.act(dt, self)
+                if u.alive:
+                    grid.update(u)
+                    chunks.place(u)
+
+    # --------------------------
+    # Sleeping units
+    # --------------------------
+    def _dozing(self, u: Unit) -> bool:
+        """True while a sleeping unit has no order and was not moved, hurt or healed."""
+        x, y, hp = self.sleeping[u.id]
+        if u.target_id is None and u.x == x and u.y == y and u.hp == hp:
+            return True
+        self._wake(u)
+        return False
+
+    def _wake(self, u: Unit):
+        x, y, _ = self.sleeping.pop(u.id)
+        for c in self._zone_cells(x, y):
+            n = self.sleep_zone[c] - 1
+            if n:
+                self.sleep_zone[c] = n
+            else:
+                del self.sleep_zone[c]
+
+    def _zone_cells(self, x: float, y: float) -> List[Tuple[int, int]]:
+        """Cells from which a unit can reach a sleeper at (x, y)."""
+        cx, cy = self.grid.cell_of(x, y)
+        r = math.ceil(self.sleep_radius / self.grid.cell_size)
+        return [(cx + dx, cy + dy) for dx in range(-r, r + 1) for dy in range(-r, r + 1)]
+
+    def _moved(self, u: Unit):
+        """Wake sleepers an enemy came near or that a unit may now touch."""
+        if self.grid.cell_of(u.x, u.y) not in self.sleep_zone:
+            return
+        sleeping = self.sleeping
+        near = self.grid.query_radius(u.x, u.y, self.sleep_radius, lambda o: o.id in sleeping, enemy_of=u.player)
+        near += self.grid.query_radius(u.x, u.y, u.radius + self.grid.max_radius,
+                                       lambda o: o.id in sleeping and o is not u, player=u.player)
+        for other in near:
+            if other.id in sleeping:
+                self._wake(other)
+
+    def _settle(self, u: Unit):
+        """After a step: re-bucket the unit, wake the sleepers it disturbs, and
+        put it to sleep if it is idle with no enemy around."""
+        if self.grid.update(u) and self.sleep_zone:
+            self._moved(u)
+        # Sleep checks are spread over ticks: each unit tries every 5th step
+        if (u.target_id is None and u.reload_timer <= 0 and (self.steps + u.id) % 5 == 0
+                and (u.regen <= 0 or u.hp >= u.max_hp) and not TYPES[u.type_code].healer
+                and not self.grid.nearest(u.x, u.y, max_dist=self.sleep_radius, enemy_of=u.player)
+                and len(self.grid.nearest(u.x, u.y, k=2, max_dist=u.radius + self.grid.max_radius)) < 2):
+            self.sleeping[u.id] = (u.x, u.y, u.hp)
+            for c in self._zone_cells(u.x, u.y):
+                self.sleep_zone[c] = self.sleep_zone.get(c, 0) + 1
+
+    def _step_scheduled(self, dt: float):
+        """Unit pass of the "wheel" scheduling mode.
+
+        A unit that is in range of a live target but still reloading only
+        does its collisions until the wheel says its reload has run out,
+        the target leaves range or dies, or its general picks another
+        target; it then catches up on its reload and steps normally.
+        Outcomes match "per_tick" as long as dt stays the same between ticks.
+        """
+        now = self.attack_wheel.now + 1
+        ready = self.attack_wheel.advance()
+        engaged = self.engaged
+        for uid in ready:
+            slot = engaged.get(uid)
+            if slot is not None and slot[3] == now:
+                slot[0] = None
+        per_unit = self.collisions == "per_unit"
+        hypot = math.hypot
+        for u in self.units:
+            if not u.alive:
+                continue
+            if u.id in self.sleeping and self._dozing(u):
+                continue
+            slot = engaged.get(u.id)
+            if slot is None:
+                u.step(dt, self)
+            else:
+                if per_unit:
+                    u.handle_collisions(self)
+                target = slot[0]
+                if (target is not None and target.alive and u.target_id == target.id
+                        and hypot(u.x - target.x, u.y - target.y) <= u.range + 0.2):
+                    if per_unit:
+                        if self.sleep_idle:
+                            self._settle(u)
+                        else:
+                            self.grid.update(u)
+                    continue
+                del engaged[u.id]
+                # Decrements the per-tick mode would have applied while waiting
+                timer = slot[2]
+                for _ in range(now - slot[1] - 1):
+                    timer -= dt
+                u.reload_timer = timer
+                u.act(dt, self)
+            if u.alive:
+                if self.sleep_idle:
+                    self._settle(u)
+                else:
+                    self.grid.update(u)
+                if u.reload_timer > 0 and u.target_id is not None:
+                    self._engage(u, dt)
+
+    def _engage(self, u: Unit, dt: float):
+        """Put a reloading unit that stands in range of its target on the wheel."""
+        if u.regen > 0 or TYPES[u.type_code].healer:
+            return
+        target = self.units_by_id.get(u.target_id)
+        if target is None or not target.alive or u.distance_to(target) > u.range + 0.2:
+            return
+        timer, ticks = u.reload_timer, 0
+        while timer > 0:
+            timer -= dt
+            ticks += 1
+        due = self.attack_wheel.schedule(u.id, ticks)
+        # [target (None once due), wheel tick parked, reload_timer then, wheel tick due]
+        self.engaged[u.id] = [target, self.attack_wheel.now, u.reload_timer, due]
+
+    def compact(self):
+        """Drop dead units from `units` and the indexes in place, keeping spawn order."""
+        _compact(self.units)
+        for units in self.units_by_player.values():
+            _compact(units)
+        for units in self.units_by_type.values():
+            _compact(units)
+        self.dead_pending = 0
+
+    def mark_dead(self, unit: Unit, killer: Optional[Unit] = None):
+        self.grid.remove(unit)
+        self.engaged.pop(unit.id, None)
+        if unit.id in self.sleeping:
+            self._wake(unit)
+        self.wounded.get(unit.player, {}).pop(unit.id, None)
+        self.lod_far.pop(unit.id, None)
+        self.lod_woken.pop(unit.id, None)
+        if self.chunks is not None:
+            self.chunks.remove(unit)
+        if self.units_by_id.get(unit.id) is unit:
+            self.units_by_id.retire(unit.id)
+        self.alive_counts[unit.player] = self.alive_counts.get(unit.player, 0) - 1
+        self.dead_pending += 1
+        self._perception = None
+        self.events.append(self.tick, EVENT_DEATH, unit.id, unit.player, killer.id if killer else None)
+
+    def alive_count(self, player: int) -> int:
+        return self.alive_counts.get(player, 0)
+
+    def close(self):
+        """Release what the run holds open (the event log's spill file)."""
+        self.events.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def perception(self) -> Perception:
+        """What the generals see this tick, built lazily and shared by all of them."""
+        p = self._perception
+        if p is None or p.tick != self.tick:
+            p = self._perception = Perception(self)
+        return p
+
+    @property
+    def winner(self) -> Optional[int]:
+        """The only player with units left, 0 if nobody is left, None while
+        the battle goes on."""
+        left = [p for p, n in self.alive_counts.items() if n > 0]
+        if len(left) > 1:
+            return None
+        return left[0] if left else 0
+
+    @property
+    def is_finished(self) -> bool:
+        return self.winner is not None
+
+    def note_damage(self, unit: Unit):
+        """Record that a unit lost hp (heals need no notice)."""
+        self.wounded.setdefault(unit.player, {})[unit.id] = unit
+
+    def wounded_allies(self, player: int) -> List[Unit]:
+        """Live units of a player below their max hp, ordered by id."""
+        wounded = self.wounded.get(player)
+        if not wounded:
+            return []
+        for uid in [uid for uid, a in wounded.items() if not a.alive or a.hp >= a.max_hp]:
+            del wounded[uid]
+        return sorted(wounded.values(), key=lambda a: a.id)
+
+    def nearest_wounded(self, x: float, y: float, player: int) -> Optional[Unit]:
+        """Closest wounded unit of a player to (x, y), lowest id on ties."""
+        wounded = self.wounded.get(player)
+        if not wounded:
+            return None
+        if len(wounded) > 32:
+            found = self.grid.nearest(x, y, predicate=lambda a: a.id in wounded and a.hp < a.max_hp,
+                                      player=player)
+            return found[0] if found else None
+        best, best_d = None, math.inf
+        for a in self.wounded_allies(player):
+            d = math.hypot(a.x - x, a.y - y)
+            if d < best_d:
+                best, best_d = a, d
+        return best
+
+    def get_units_for_player(self, player: int, unit_type: Union[str, int, None] = None) -> List[Unit]:
+        """Live units of a player (optionally of one type, by name or code).
+        The list is the engine's own index: read it, don't modify it."""
+        if unit_type is None:
+            units = self.units_by_player.get(player, [])
+        else:
+            units = self.units_by_type.get((player, get_type(unit_type).code), [])
+        if self.dead_pending:
+            return [u for u in units if u.alive]
+        return units
+
+    def get_enemies_of(self, player: int, unit_type: Union[str, int, None] = None) -> List[Unit]:
+        """Live units of every other player: in spawn order for a single enemy,
+        merged by id otherwise (spawn order until ids are recycled, see UnitSlots)."""
+        others = [p for p in self.units_by_player if p != player]
+        if len(others) == 1:
+            return self.get_units_for_player(others[0], unit_type)
+        enemies = [u for p in others for u in self.get_units_for_player(p, unit_type)]
+        enemies.sort(key=lambda u: u.id)
+        return enemies
+
 
-    def get_units_for_player(self, player: int) -> List[Unit]:
-        return [u for u in self.units if u.player == player and u.alive]
\ No newline at end of file
+def _compact(units: List[Unit]):
+    j = 0
+    for u in units:
+        if u.alive:
+            units[j] = u
+            j += 1
+    del units[j:]
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""
+Bounded battle event log: typed records in a ring buffer, formatted to text
+only when a report asks for it, with an optional binary spill file
+"""
+import os
+import re
+import struct
+from collections import deque
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+EVENT_DEATH = 0
+
+# tick, kind, unit id, player, killer id (-1 = none)
+_RECORD = struct.Struct('<dBqqq')
+_LEGACY_DEATH = re.compile(r"Unit (\d+) \(P(\d+)\) died at tick ([-\d.]+)")
+
+
+class Event(NamedTuple):
+    tick: float
+    kind: int
+    unit_id: int
+    player: int
+    killer_id: Optional[int] = None
+
+    def format(self) -> str:
+        if self.kind == EVENT_DEATH:
+            return f"Unit {self.unit_id} (P{self.player}) died at tick {self.tick:.2f}"
+        return f"Event {self.kind} on unit {self.unit_id} (P{self.player}) at tick {self.tick:.2f}"
+
+
+class EventLog:
+    """Keeps the last `capacity` events in memory.
+
+    With `spill_path` set, every event is also appended to that file so the
+    full history of a long run survives without staying in memory. The file
+    is started afresh: it only ever holds this log's events. Call `close`
+    (the engine's `close` does) once the run is over.
+    """
+
+    def __init__(self, capacity: int = 10000, spill_path: Optional[str] = None):
+        self.capacity = capacity
+        self.buffer = deque(maxlen=capacity)
+        self.total = 0
+        self.spill_path = spill_path
+        self._spill = open(spill_path, 'wb') if spill_path else None
+
+    def append(self, tick: float, kind: int, unit_id: int, player: int, killer_id: Optional[int] = None):
+        event = Event(tick, kind, unit_id, player, killer_id)
+        self.buffer.append(event)
+        self.total += 1
+        if self._spill is not None:
+            self._spill.write(_RECORD.pack(tick, kind, unit_id, player, -1 if killer_id is None else killer_id))
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self.buffer)
+
+    def recent(self, n: int) -> List[Event]:
+        """The last n events still in memory, oldest first."""
+        if n <= 0:
+            return []
+        start = max(0, len(self.buffer) - n)
+        return [self.buffer[i] for i in range(start, len(self.buffer))]
+
+    def history(self) -> Iterable[Event]:
+        """Every event: read back from the spill file when there is one."""
+        if self.spill_path is None:
+            return list(self.buffer)
+        if self._spill is not None:
+            self._spill.flush()
+        return read_spill(self.spill_path)
+
+    def lines(self, n: Optional[int] = None) -> List[str]:
+        """Formatted text for the last n events, or the whole history."""
+        events = self.history() if n is None else self.recent(n)
+        return [e.format() for e in events]
+
+    def records(self) -> List[tuple]:
+        """Plain tuples of the in-memory events, for saving."""
+        return [tuple(e) for e in self.buffer]
+
+    def load(self, saved: Iterable):
+        """Replace the in-memory events with saved records; also accepts the
+        text lines written by older save files."""
+        self.buffer.clear()
+        self.total = 0
+        for item in saved:
+            if isinstance(item, str):
+                m = _LEGACY_DEATH.match(item)
+                if m is None:
+                    continue
+                item = (float(m.group(3)), EVENT_DEATH, int(m.group(1)), int(m.group(2)))
+            self.buffer.append(Event(*item))
+            self.total += 1
+
+    def truncate(self, total: int):
+        """Forget the events appended after the log held `total` events
+        (rewinding a battle); they are also cut from the spill file."""
+        n = self.total - total
+        if n <= 0:
+            return
+        for _ in range(min(n, len(self.buffer))):
+            self.buffer.pop()
+        self.total = total
+        if self._spill is not None:
+            self._spill.flush()
+            self._spill.truncate(max(0, self._spill.tell() - n * _RECORD.size))
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+
+def read_spill(path: str) -> Iterator[Event]:
+    """Stream the events stored in a spill file."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(_RECORD.size)
+            if len(chunk) < _RECORD.size:
+                break
+            tick, kind, unit_id, player, killer_id = _RECORD.unpack(chunk)
+            yield Event(tick, kind, unit_id, player, None if killer_id < 0 else killer_id)
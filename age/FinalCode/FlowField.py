@@ -0,0 +1,121 @@
+"""
+Flow fields shared by the units of a general: a goal (a point to reach, or
+threats to flee from) is turned once per update into a grid that every unit
+then reads from its own cell
+"""
+from abc import ABC, abstractmethod
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+from Units import Unit
+
+Key = Tuple[int, int]
+
+
+class FlowField(ABC):
+    """Direction to follow in every square cell of `cell` world units.
+
+    A field is only read once built, so a single build serves the whole
+    army until the general's next update. Cells are filled on demand.
+    """
+
+    def __init__(self, cell: float = 1.0):
+        self.cell = cell
+
+    def key_of(self, x: float, y: float) -> Key:
+        return (math.floor(x / self.cell), math.floor(y / self.cell))
+
+    @abstractmethod
+    def direction(self, x: float, y: float) -> Tuple[float, float]:
+        """Unit vector to follow from (x, y), (0, 0) where the field is flat."""
+
+    def advance(self, u: Unit, step_len: float):
+        """Move a unit `step_len` along the field (not at all where it is flat)."""
+        nx, ny = self.direction(u.x, u.y)
+        u.x += nx * step_len
+        u.y += ny * step_len
+
+
+class GoalField(FlowField):
+    """Field pointing at `goal` (rally point, enemy centroid...).
+
+    Every cell keeps the direction from its centre to the goal, so all the
+    units of a cell share one computation. Near the goal the cell is too
+    coarse: within `exact` cells the direction is taken from the unit itself.
+    """
+
+    def __init__(self, goal: Tuple[float, float], cell: float = 1.0, exact: int = 2):
+        super().__init__(cell)
+        self.goal = goal
+        self.exact = exact
+        self._goal_key = self.key_of(*goal)
+        self._dirs: Dict[Key, Tuple[float, float]] = {}
+
+    def direction(self, x: float, y: float) -> Tuple[float, float]:
+        key = (math.floor(x / self.cell), math.floor(y / self.cell))
+        d = self._dirs.get(key)
+        if d is not None:
+            return d
+        gx, gy = self._goal_key
+        if abs(key[0] - gx) <= self.exact and abs(key[1] - gy) <= self.exact:
+            return _unit_vector(self.goal[0] - x, self.goal[1] - y)
+        cx, cy = (key[0] + 0.5) * self.cell, (key[1] + 0.5) * self.cell
+        d = self._dirs[key] = _unit_vector(self.goal[0] - cx, self.goal[1] - cy)
+        return d
+
+
+class ThreatField(FlowField):
+    """Field leading away from the nearest of `threats` within `radius`.
+
+    Each threat is stamped once into the cells it can reach, in the order
+    given; `nearest` then only measures the few threats of the unit's cell.
+    For anything within `radius` it returns the same unit as a full scan
+    (ties go to the threat listed first), so callers keep their exact
+    distance tests.
+    """
+
+    def __init__(self, threats: Iterable[Unit], radius: float, cell: Optional[float] = None):
+        # Cells as wide as the radius: each threat lands in at most 9 of them
+        cell = cell or radius
+        super().__init__(cell)
+        self.radius = radius
+        self.cells: Dict[Key, List[Unit]] = {}
+        r2 = radius * radius
+        for t in threats:
+            x0, x1 = math.floor((t.x - radius) / cell), math.floor((t.x + radius) / cell)
+            y0, y1 = math.floor((t.y - radius) / cell), math.floor((t.y + radius) / cell)
+            for cx in range(x0, x1 + 1):
+                # Distance from the threat to the cell's box, per axis
+                ex = max(cx * cell - t.x, 0.0, t.x - (cx + 1) * cell)
+                for cy in range(y0, y1 + 1):
+                    ey = max(cy * cell - t.y, 0.0, t.y - (cy + 1) * cell)
+                    if ex * ex + ey * ey <= r2:
+                        bucket = self.cells.get((cx, cy))
+                        if bucket is None:
+                            self.cells[(cx, cy)] = [t]
+                        else:
+                            bucket.append(t)
+
+    def nearest(self, x: float, y: float) -> Optional[Unit]:
+        """Nearest threat within `radius` of (x, y), or None."""
+        bucket = self.cells.get((math.floor(x / self.cell), math.floor(y / self.cell)))
+        if not bucket:
+            return None
+        best, best_d = None, self.radius
+        for t in bucket:
+            d = math.hypot(x - t.x, y - t.y)
+            if d < best_d or (best is None and d == best_d):
+                best, best_d = t, d
+        return best
+
+    def direction(self, x: float, y: float) -> Tuple[float, float]:
+        t = self.nearest(x, y)
+        if t is None:
+            return (0.0, 0.0)
+        return _unit_vector(x - t.x, y - t.y)
+
+
+def _unit_vector(dx: float, dy: float) -> Tuple[float, float]:
+    d = math.hypot(dx, dy)
+    if d < 1e-6:
+        return (0.0, 0.0)
+    return (dx / d, dy / d)
@@ -0,0 +1,49 @@
+"""
+Formation generators for the scenarios: positions of a whole group of units
+computed at once, to hand to engine.spawn_units
+"""
+from typing import Sequence, Tuple
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Point = Tuple[float, float]
+
+
+def block(count: int, per_column: int, origin: Point, column_step: Point, row_step: Point,
+          start: int = 0) -> Tuple[Sequence[float], Sequence[float]]:
+    """Units start..start+count-1 of a block filled column by column.
+
+    Unit i sits in column i // per_column and row i % per_column, at
+    origin + column * column_step + row * row_step. `start` carries the
+    numbering on from a previous group (several types in one block).
+    """
+    ox, oy = origin
+    cx, cy = column_step
+    rx, ry = row_step
+    if np is not None:
+        col, row = np.divmod(np.arange(start, start + count), per_column)
+        return ox + col * cx + row * rx, oy + col * cy + row * ry
+    idx = range(start, start + count)
+    return ([ox + (i // per_column) * cx + (i % per_column) * rx for i in idx],
+            [oy + (i // per_column) * cy + (i % per_column) * ry for i in idx])
+
+
+def wedge(count: int, apex: Point, depth: float, back_step: float, side_step: float,
+          facing: int) -> Tuple[Sequence[float], Sequence[float]]:
+    """Two wings spreading back from `apex`, units alternating between them.
+
+    Unit i is the (i // 2)-th of the upper wing when i is even, of the lower
+    one otherwise; every unit of a wing stands `back_step` further back and
+    `side_step` further out than the previous. `depth` moves the whole layer
+    back, `facing` is +1 for an army facing +x, -1 for one facing -x.
+    """
+    ax, ay = apex
+    if np is not None:
+        i = np.arange(count)
+        pos = i // 2
+        side = np.where(i % 2 == 0, 1, -1)
+        return ax - (pos * back_step + depth) * facing, ay + pos * side_step * side
+    return ([ax - ((i // 2) * back_step + depth) * facing for i in range(count)],
+            [ay + (i // 2) * side_step * (1 if i % 2 == 0 else -1) for i in range(count)])
@@ -26,7 +26,7 @@ class GameStateManager:
                 'h': engine.h,
                 'next_unit_id': engine.next_unit_id,
                 'tick': engine.tick,
-                'events': engine.events.copy(),
+                'events': engine.events.records(),
                 'units': []
             },
             'generals': {}
@@ -47,12 +47,9 @@ class GameStateManager:
                 'target_id': u.target_id,
                 'regen': u.regen,
                 'unit_type': u.unit_type,
-                'color': u.color,
+                'last_x': u.last_x,
+                'last_y': u.last_y,
             }
-            # Save direction tracking if exists
-            if hasattr(u, 'last_x'):
-                unit_data['last_x'] = u.last_x
-                unit_data['last_y'] = u.last_y
             state['engine']['units'].append(unit_data)
         
         # Save general types
@@ -88,25 +85,18 @@ class GameStateManager:
         engine.h = state['engine']['h']
         engine.next_unit_id = state['engine']['next_unit_id']
         engine.tick = state['engine']['tick']
-        engine.events = state['engine']['events'].copy()
+        engine.events.load(state['engine']['events'])
         engine.units.clear()
         engine.units_by_id.clear()
         
         # Restore units
         for unit_data in state['engine']['units']:
-            # Extract last_x, last_y before creating Unit (they're not constructor params)
-            last_x = unit_data.pop('last_x', None)
-            last_y = unit_data.pop('last_y', None)
-            
+            # Colours now come from the unit type registry; older saves still carry one
+            unit_data = {k: v for k, v in unit_data.items() if k != 'color'}
             u = Unit(**unit_data)
-            
-            # Restore direction tracking if exists
-            if last_x is not None:
-                u.last_x = last_x
-                u.last_y = last_y
-            
             engine.units.append(u)
             engine.units_by_id[u.id] = u
+        engine.reindex()
     
     def restore_generals(self, state):
         """Restore generals from saved data"""
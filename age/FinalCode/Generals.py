@@ -2,40 +2,126 @@ from __future__ import annotations
 from dataclasses import dataclass
 import random
 import math
+from UnitTypes import PIKEMAN, CROSSBOWMAN, KNIGHT, MONK, MAGE
+from FlowField import GoalField, ThreatField
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Distance-matrix entries computed at once by nearest_enemies
+NEAREST_BLOCK = 1 << 20
 
 @dataclass
 class General:
+    # True if, while no enemy is in range, give_orders only hands a target to
+    # units without one: SimpleEngine.warp may then call it once for many ticks
+    steady_approach = False
+    # Distance under which give_orders may hand a target to a unit without one
+    # (0: whatever the distance); a warp stops before two enemies get that close
+    engage_radius = 0.0
+
     def __init__(self, player: int):
         self.player = player
     def give_orders(self, engine: SimpleEngine):
         raise NotImplementedError
 
+def nearest_enemies(units: list, player: int, engine: SimpleEngine, max_dist: float = math.inf) -> list:
+    """For every unit, the enemy engine.grid.nearest(..., max_dist=max_dist,
+    enemy_of=player) would return, or None.
+
+    Units and enemies are sorted by x; each block of units only measures
+    the enemies whose x is within max_dist of the block. Squared distances
+    are taken in NumPy, then the few enemies within rounding of each unit's
+    best are measured with math.hypot like grid.nearest, ties going to the
+    lowest id, so the picks are exactly the same.
+    """
+    seen = engine.perception
+    enemies = seen.enemies(player)
+    picks = [None] * len(units)
+    if not units or not enemies:
+        return picks
+    ex, ey = seen.enemy_positions(player)
+    by_x = np.argsort(ex, kind='stable')
+    sx, sy = ex[by_x], ey[by_x]
+    ux = np.fromiter((u.x for u in units), dtype=np.float64, count=len(units))
+    uy = np.fromiter((u.y for u in units), dtype=np.float64, count=len(units))
+    order = np.argsort(ux, kind='stable')
+    rows = max(1, min(256, NEAREST_BLOCK // len(enemies)))
+    # Window half-width, with room for rounding at exactly max_dist
+    reach = max_dist * (1 + 1e-9) + 1e-9
+    for start in range(0, len(units), rows):
+        idx = order[start:start + rows]
+        bx, by = ux[idx], uy[idx]
+        lo = int(np.searchsorted(sx, bx[0] - reach, side='left'))
+        hi = int(np.searchsorted(sx, bx[-1] + reach, side='right'))
+        if lo >= hi:
+            continue
+        dx = sx[None, lo:hi] - bx[:, None]
+        dy = sy[None, lo:hi] - by[:, None]
+        d2 = dx * dx + dy * dy
+        best = d2.min(axis=1)
+        close_rows, close_cols = np.nonzero((d2 <= best[:, None] * (1 + 1e-9))
+                                            & (best <= max_dist * max_dist * (1 + 1e-9))[:, None])
+        candidates = {}
+        for i, j in zip(close_rows.tolist(), (close_cols + lo).tolist()):
+            candidates.setdefault(i, []).append(enemies[by_x[j]])
+        for i, group in candidates.items():
+            u = units[idx[i]]
+            d, _, e = min(((math.hypot(e.x - u.x, e.y - u.y), e.id, e) for e in group),
+                          key=lambda t: (t[0], t[1]))
+            if d <= max_dist:
+                picks[idx[i]] = e
+    return picks
+
 class BrainDeadGeneral(General):
+    steady_approach = True
+    engage_radius = 5.0
+
     def give_orders(self, engine: SimpleEngine):
-        my_units = engine.get_units_for_player(self.player)
-        for u in my_units:
-            if u.target_id is not None and u.target_id in engine.units_by_id:
-                continue
-            enemies = [e for e in engine.units if e.player != self.player and e.alive]
-            if not enemies:
-                return
-            nearby = [e for e in enemies if u.distance_to(e) < 5.0]
-            if nearby:
-                target = min(nearby, key=lambda e: u.distance_to(e))
-                u.target_id = target.id
+        seen = engine.perception
+        my_units = seen.units(self.player)
+        if not seen.enemies(self.player):
+            return
+        idle = [u for u in my_units if u.target_id is None or u.target_id not in engine.units_by_id]
+        if np is not None:
+            # Un seul calcul groupé pour toutes les unités sans cible
+            for u, e in zip(idle, nearest_enemies(idle, self.player, engine, max_dist=self.engage_radius)):
+                if e is not None and u.distance_to(e) < self.engage_radius:
+                    u.target_id = e.id
+            return
+        for u in idle:
+            nearby = engine.grid.nearest(u.x, u.y, max_dist=self.engage_radius, enemy_of=self.player)
+            if nearby and u.distance_to(nearby[0]) < self.engage_radius:
+                u.target_id = nearby[0].id
 
 class DaftGeneral(General):
+    steady_approach = True
+
     def give_orders(self, engine: SimpleEngine):
-        my_units = engine.get_units_for_player(self.player)
-        enemy_units = [u for u in engine.units if u.player != self.player and u.alive]
+        seen = engine.perception
+        my_units = seen.units(self.player)
+        enemy_units = seen.enemies(self.player)
         if not enemy_units:
             return
-        for u in my_units:
-            if u.target_id is not None and u.target_id in engine.units_by_id:
-                continue
-            nearest = min(enemy_units, key=lambda e: u.distance_to(e))
-            u.target_id = nearest.id
+        idle = [u for u in my_units if u.target_id is None or u.target_id not in engine.units_by_id]
+        if np is not None:
+            for u, e in zip(idle, nearest_enemies(idle, self.player, engine)):
+                u.target_id = e.id
+            return
+        for u in idle:
+            nearest = engine.grid.nearest(u.x, u.y, enemy_of=self.player)
+            u.target_id = nearest[0].id
 class New_General_1(General):
+    # attacker type -> defender type -> target priority
+    COUNTERS = {
+        PIKEMAN: {KNIGHT: 50, CROSSBOWMAN: -10},
+        KNIGHT: {CROSSBOWMAN: 60, MAGE: 60, MONK: 25, PIKEMAN: -40},
+        # prefer high value targets
+        CROSSBOWMAN: {MAGE: 40, CROSSBOWMAN: 40, MONK: 30, KNIGHT: -10},
+        MAGE: {CROSSBOWMAN: 40, MAGE: 40, KNIGHT: 20, PIKEMAN: -15},
+    }
+
     def __init__(self, player: int):
         super().__init__(player)
         self.last_update = 0.0
@@ -47,23 +133,19 @@ class New_General_1(General):
             return  # avoid changing targets every frame
         self.last_update = t
 
-        my_units = engine.get_units_for_player(self.player)
-        enemies = [u for u in engine.units if u.player != self.player and u.alive]
+        seen = engine.perception
+        my_units = seen.units(self.player)
+        enemies = seen.enemies(self.player)
 
         if not enemies:
             return
 
         # map: enemy_id -> number of allies already targeting
-        focus_count = {}
-        for u in my_units:
-            if u.target_id in focus_count:
-                focus_count[u.target_id] += 1
-            elif u.target_id is not None:
-                focus_count[u.target_id] = 1
+        focus_count = dict(seen.attackers(self.player))
 
         for u in my_units:
             # --- Monks: heal first ---
-            if u.unit_type == "Monk":
+            if u.type_code == MONK:
                 self.handle_monk(u, engine)
                 continue
 
@@ -80,7 +162,7 @@ class New_General_1(General):
     # Monk behavior
     # --------------------------
     def handle_monk(self, monk: "Unit", engine: "SimpleEngine"):
-        allies = [a for a in engine.units if a.player == monk.player and a.hp < 55 and a.alive]
+        allies = [a for a in engine.perception.wounded(monk.player) if a.hp < a.max_hp]
         if not allies:
             return  # nothing to heal
 
@@ -90,7 +172,7 @@ class New_General_1(General):
         dt = 0.2  # assume small timestep for healing scale
 
         if dist <= monk.range:
-            target.hp = min(target.hp + monk.attack * dt * 2, 55)
+            target.hp = min(target.hp + monk.attack * dt * 2, target.max_hp)
         else:
             # move closer
             dx = target.x - monk.x
@@ -105,34 +187,17 @@ class New_General_1(General):
     def choose_best_target(self, u: "Unit", enemies: list, focus_count: dict):
         best_score = -9999
         best_enemy = None
+        # --- Unit-specific priorities ---
+        counters = self.COUNTERS.get(u.type_code, {})
+        ranged = u.type_code == CROSSBOWMAN
 
         for e in enemies:
             dist = u.distance_to(e)
-            score = 0
+            score = counters.get(e.type_code, 0)
 
-            # --- Unit-specific priorities ---
-            if u.unit_type == "Pikeman":
-                if e.unit_type == "knight": score += 50
-                if e.unit_type == "Crossbowman": score -= 10
-
-            elif u.unit_type == "knight":
-                if e.unit_type in ["Crossbowman", "mage"]: score += 60
-                if e.unit_type == "Monk": score += 25
-                if e.unit_type == "Pikeman": score -= 40
-
-            elif u.unit_type == "Crossbowman":
-                # prefer high value targets
-                if e.unit_type in ["mage", "Crossbowman"]: score += 40
-                if e.unit_type == "Monk": score += 30
-                if e.unit_type == "knight": score -= 10
-                # maintain distance from melee
-                if dist < 2 and e.unit_type in ["Pikeman", "knight"]:
-                    score -= 30
-
-            elif u.unit_type == "mage":
-                if e.unit_type in ["Crossbowman", "mage"]: score += 40
-                if e.unit_type == "knight": score += 20
-                if e.unit_type == "Pikeman": score -= 15
+            # maintain distance from melee
+            if ranged and dist < 2 and e.type_code in (PIKEMAN, KNIGHT):
+                score -= 30
 
             # --- Generic scoring ---
             score -= dist  # prefer closer
@@ -150,33 +215,43 @@ class New_General_1(General):
 
 
 class New_General_2(General):
+    # attacker type -> defender type -> target priority
+    COUNTERS = {
+        PIKEMAN: {KNIGHT: 70, MAGE: 5, CROSSBOWMAN: -8},
+        KNIGHT: {CROSSBOWMAN: 80, MAGE: 80, MONK: 30, PIKEMAN: -50},
+        CROSSBOWMAN: {MAGE: 40, CROSSBOWMAN: 40, MONK: 30, KNIGHT: -12},
+        # mage behaves like ranged single-target for now (no AOE)
+        MAGE: {CROSSBOWMAN: 45, MAGE: 45, KNIGHT: 15, PIKEMAN: -12},
+    }
+
     def __init__(self, player: int):
         super().__init__(player)
         self.last_update = 0.0
         self.update_interval = 0.25  # responsive but stable
         self.kite_step_dt = 0.18     # micro-step amount for kiting/retreat
         self.rally_point = None      # computed each update (x,y)
+        self.rally_field = None      # GoalField toward rally_point, shared by every retreat
 
     def handle_monk(self, unit, engine, enemies):
         # simple safe monk behavior: heal lowest hp ally but avoid suicide
-        allies = [a for a in engine.units if a.player == unit.player and a.alive and a.hp < 55]
+        allies = [a for a in engine.perception.wounded(unit.player) if a.hp < a.max_hp]
         if not allies:
             return
         # prefer protected allies (behind friends) but prioritize lowest HP
         target = min(allies, key=lambda a: a.hp)
         dist = unit.distance_to(target)
         # if melee threats too close, avoid going directly into danger: move toward rally point instead
-        threats = [e for e in enemies if e.alive and unit.distance_to(e) <= 3.0 and e.unit_type.lower() in ("knight", "pikeman")]
+        threats = [e for e in enemies if e.alive and unit.distance_to(e) <= 3.0 and e.type_code in (KNIGHT, PIKEMAN)]
         if threats:
             # stay back toward rally point
             if self.rally_point:
-                self.retreat_to_point(unit, self.rally_point, dt=self.kite_step_dt)
+                self.retreat_to_point(unit, self.rally_field, dt=self.kite_step_dt)
             return
 
         # heal if in range, else move toward ally (full speed)
         if dist <= unit.range:
             heal_amount = unit.attack * self.update_interval * 2  # consistent with Unit.step healing (approx)
-            target.hp = min(target.hp + heal_amount, 55)
+            target.hp = min(target.hp + heal_amount, target.max_hp)
         else:
             dx = target.x - unit.x
             dy = target.y - unit.y
@@ -194,8 +269,9 @@ class New_General_2(General):
             return
         self.last_update = t
 
-        my_units = engine.get_units_for_player(self.player)
-        enemies = [u for u in engine.units if u.player != self.player and u.alive]
+        seen = engine.perception
+        my_units = seen.units(self.player)
+        enemies = seen.enemies(self.player)
 
         # If no enemies remain, do nothing (prevents empty-list errors)
         if not enemies:
@@ -205,13 +281,14 @@ class New_General_2(General):
             return
 
         # compute rally point = center of mass of friendly units
-        self.rally_point = self.compute_army_center(my_units)
+        self.rally_point = seen.centroid(self.player)
+        self.rally_field = GoalField(self.rally_point)
+        # threat fields, built the first time a unit needs them this update
+        knight_field = None
+        melee_field = None
 
         # map: enemy_id -> number of allies already targeting
-        focus_count: Dict[int,int] = {}
-        for u in my_units:
-            if u.target_id is not None:
-                focus_count[u.target_id] = focus_count.get(u.target_id, 0) + 1
+        focus_count: Dict[int,int] = dict(seen.attackers(self.player))
 
         # main per-unit decision loop
         for u in my_units:
@@ -231,7 +308,7 @@ class New_General_2(General):
                     u.target_id = None
 
             # monks: healer logic
-            if u.unit_type.lower() == "monk":
+            if u.type_code == MONK:
                 self.handle_monk(u, engine, enemies)
                 continue
 
@@ -247,27 +324,31 @@ class New_General_2(General):
                         # attack this tick, then retreat on next decision tick
                         continue
                 # otherwise retreat now
-                self.retreat_to_point(u, self.rally_point, dt=self.kite_step_dt)
+                self.retreat_to_point(u, self.rally_field, dt=self.kite_step_dt)
                 u.target_id = None
                 continue
 
             # Knight special: try to dive backline when safe
-            if u.unit_type.lower() == "knight":
+            if u.type_code == KNIGHT:
                 target = self.pick_backline_target_for_knight(u, enemies, focus_count, engine)
                 if target:
                     u.target_id = target.id
                     continue
 
             # Pikeman special: intercept knights if nearby
-            if u.unit_type.lower() == "pikeman":
-                knight = self.find_nearest_enemy_of_type(u, enemies, "knight", max_dist=8.0)
+            if u.type_code == PIKEMAN:
+                if knight_field is None:
+                    knight_field = ThreatField([e for e in enemies if e.type_code == KNIGHT], 8.0)
+                knight = knight_field.nearest(u.x, u.y)
                 if knight:
                     u.target_id = knight.id
                     continue
 
             # Ranged micro: if melee threat is near, micro-step away this tick (kiting)
-            if u.unit_type.lower() in ("crossbowman", "mage"):
-                melee = self.find_nearest_enemy_of_types(u, enemies, ["pikeman", "knight"], max_dist=5.0)
+            if u.type_code in (CROSSBOWMAN, MAGE):
+                if melee_field is None:
+                    melee_field = ThreatField([e for e in enemies if e.type_code in (PIKEMAN, KNIGHT)], 5.0)
+                melee = melee_field.nearest(u.x, u.y)
                 if melee:
                     dist = u.distance_to(melee)
                     if dist < max(2.0, u.range * 0.7):
@@ -280,7 +361,7 @@ class New_General_2(General):
                 continue
 
             # Choose best target normally (focus + counters)
-            best_enemy = self.choose_best_target(u, enemies, focus_count)
+            best_enemy = self.choose_best_target(u, enemies, focus_count, engine)
             if best_enemy:
                 u.target_id = best_enemy.id
 
@@ -295,23 +376,13 @@ class New_General_2(General):
         return (sx / len(units), sy / len(units))
 
     def evaluate_local_battle(self, unit: "Unit", engine: "SimpleEngine", radius: float = 6.0):
-        friends = [u for u in engine.units if u.player == unit.player and u.alive and unit.distance_to(u) <= radius]
-        foes = [u for u in engine.units if u.player != unit.player and u.alive and unit.distance_to(u) <= radius]
-        return len(friends), len(foes)
-
-    def retreat_to_point(self, unit: "Unit", point: tuple, dt: float = 0.18):
-        px, py = point
-        dx = px - unit.x
-        dy = py - unit.y
-        dist = math.hypot(dx, dy)
-        if dist < 1e-6:
-            return
-        nx = dx / dist
-        ny = dy / dist
+        near = engine.grid.query_radius(unit.x, unit.y, radius)
+        friends = sum(1 for u in near if u.player == unit.player)
+        return friends, len(near) - friends
+
+    def retreat_to_point(self, unit: "Unit", field: GoalField, dt: float = 0.18):
         # move toward rally point (retreat/regroup) using micro step
-        step_len = unit.speed * dt
-        unit.x += nx * step_len
-        unit.y += ny * step_len
+        field.advance(unit, unit.speed * dt)
 
     def micro_step_away(self, unit: "Unit", threat: "Unit", dt: float = 0.18):
         # move directly away from threat a little bit (simple kite/micro)
@@ -324,32 +395,12 @@ class New_General_2(General):
         unit.x += nx * step_len
         unit.y += ny * step_len
 
-    def find_nearest_enemy_of_type(self, u: "Unit", enemies: List["Unit"], typ: str, max_dist: float = 9999.0):
-        typ = typ.lower()
-        candidates = [e for e in enemies if e.unit_type.lower() == typ]
-        if not candidates:
-            return None
-        candidates = sorted(candidates, key=lambda e: u.distance_to(e))
-        if candidates and u.distance_to(candidates[0]) <= max_dist:
-            return candidates[0]
-        return None
-
-    def find_nearest_enemy_of_types(self, u: "Unit", enemies: List["Unit"], typlist: List[str], max_dist: float = 9999.0):
-        typs = set([t.lower() for t in typlist])
-        candidates = [e for e in enemies if e.unit_type.lower() in typs]
-        if not candidates:
-            return None
-        candidates = sorted(candidates, key=lambda e: u.distance_to(e))
-        if candidates and u.distance_to(candidates[0]) <= max_dist:
-            return candidates[0]
-        return None
-
     def pick_backline_target_for_knight(self, u: "Unit", enemies: List["Unit"], focus_count: Dict[int,int], engine: "SimpleEngine"):
         # guard: if no enemies, nothing to pick
         if not enemies:
             return None
         # prefer fragile ranged units (mage/crossbowman) that are not heavily protected by friends
-        candidates = [e for e in enemies if e.unit_type.lower() in ("crossbowman", "mage")]
+        candidates = [e for e in enemies if e.type_code in (CROSSBOWMAN, MAGE)]
         if not candidates:
             # fallback: nearest enemy (safe because enemies is non-empty here)
             return min(enemies, key=lambda e: u.distance_to(e))
@@ -359,7 +410,7 @@ class New_General_2(General):
         for e in candidates:
             dist = u.distance_to(e)
             # count defenders near the candidate
-            defenders = sum(1 for a in engine.units if a.player == e.player and a.alive and e.distance_to(a) <= 4.0)
+            defenders = len(engine.grid.query_radius(e.x, e.y, 4.0, player=e.player))
             score = -dist - defenders * 6  # farther & more defenders = worse
             # prefer low-HP targets
             score += (10 - e.hp * 0.1)
@@ -373,44 +424,25 @@ class New_General_2(General):
     # --------------------------
     # Target selection (scoring)
     # --------------------------
-    def choose_best_target(self, u: "Unit", enemies: List["Unit"], focus_count: Dict[int,int]):
+    def choose_best_target(self, u: "Unit", enemies: List["Unit"], focus_count: Dict[int,int], engine: "SimpleEngine"):
         # safety: if no enemies available, return None
         if not enemies:
             return None
 
         best_score = -9e9
         best_enemy = None
-        ut = u.unit_type.lower()
+        # unit-specific counters / priorities
+        counters = self.COUNTERS.get(u.type_code, {})
+        ranged = u.type_code == CROSSBOWMAN
 
         for e in enemies:
-            e_ut = e.unit_type.lower()
+            e_ut = e.type_code
             dist = u.distance_to(e)
-            score = 0.0
-
-            # unit-specific counters / priorities
-            if ut == "pikeman":
-                if e_ut == "knight": score += 70
-                if e_ut == "mage": score += 5
-                if e_ut == "crossbowman": score -= 8
-
-            elif ut == "knight":
-                if e_ut in ("crossbowman", "mage"): score += 80
-                if e_ut == "monk": score += 30
-                if e_ut == "pikeman": score -= 50
-
-            elif ut == "crossbowman":
-                if e_ut in ("mage", "crossbowman"): score += 40
-                if e_ut == "monk": score += 30
-                if e_ut == "knight": score -= 12
-                # penalize being too close to melee
-                if dist < 2.0 and e_ut in ("pikeman", "knight"):
-                    score -= 35
-
-            elif ut == "mage":
-                # mage behaves like ranged single-target for now (no AOE)
-                if e_ut in ("crossbowman", "mage"): score += 45
-                if e_ut == "knight": score += 15
-                if e_ut == "pikeman": score -= 12
+            score = counters.get(e_ut, 0.0)
+
+            # penalize being too close to melee
+            if ranged and dist < 2.0 and e_ut in (PIKEMAN, KNIGHT):
+                score -= 35
 
             # generic scoring: prefer closer and lower hp
             score -= dist * 0.9
@@ -428,7 +460,7 @@ class New_General_2(General):
                 score -= 8.0
 
             # prefer enemies that are not heavily defended
-            defenders = sum(1 for a in enemies if a.player == e.player and a.alive and e.distance_to(a) <= 3.0)
+            defenders = len(engine.grid.query_radius(e.x, e.y, 3.0, player=e.player))
             score -= defenders * 2.0
 
             if score > best_score:
@@ -440,7 +472,7 @@ class New_General_2(General):
 class New_General_3(General):
     def __init__(self, player: int):
         super().__init__(player)
-        self.global_targets = {}   # unit_type -> enemy_id
+        self.global_targets = {}   # type code -> enemy_id
         self.retarget_cooldown = 0.0
 
     def give_orders(self, engine: "SimpleEngine"):
@@ -448,8 +480,9 @@ class New_General_3(General):
         if t < self.retarget_cooldown:
             return
 
-        my_units = engine.get_units_for_player(self.player)
-        enemies = [u for u in engine.units if u.player != self.player and u.alive]
+        seen = engine.perception
+        my_units = seen.units(self.player)
+        enemies = seen.enemies(self.player)
         if not enemies:
             return
 
@@ -459,7 +492,7 @@ class New_General_3(General):
                 del self.global_targets[k]
 
         # assign new global targets if missing
-        for ut in {"pikeman", "knight", "crossbowman", "mage"}:
+        for ut in (PIKEMAN, KNIGHT, CROSSBOWMAN, MAGE):
             if ut not in self.global_targets:
                 tgt = self.pick_global_target(ut, enemies, engine)
                 if tgt:
@@ -467,10 +500,10 @@ class New_General_3(General):
 
         # enforce orders
         for u in my_units:
-            ut = u.unit_type.lower()
+            ut = u.type_code
 
             # monks stay healers (do not fight)
-            if ut == "monk":
+            if ut == MONK:
                 continue
 
             # HARD LOCK: do not retarget individually
@@ -489,20 +522,19 @@ class New_General_3(General):
             score = 0
 
             # priority = damage removed per second
-            if e.unit_type.lower() in ("crossbowman", "mage"):
+            if e.type_code in (CROSSBOWMAN, MAGE):
                 score += 120
-            if e.unit_type.lower() == "knight":
+            if e.type_code == KNIGHT:
                 score += 80
-            if e.unit_type.lower() == "pikeman":
+            if e.type_code == PIKEMAN:
                 score += 50
-            if e.unit_type.lower() == "monk":
+            if e.type_code == MONK:
                 score += 100
 
             # favor already-engaged clusters
-            nearby_allies = sum(
-                1 for a in engine.units
-                if a.player == self.player and a.alive and e.distance_to(a) < 3.5
-            )
+            nearby_allies = len(engine.grid.query_radius(
+                e.x, e.y, 3.5, lambda a: e.distance_to(a) < 3.5, player=self.player
+            ))
             score += nearby_allies * 5
 
             # fragile targets die faster → tempo advantage
@@ -516,8 +548,9 @@ class New_General_3(General):
 
 class GenghisKhanPrimeGeneral(General):
     def give_orders(self, engine: "SimpleEngine"):
-        my_units = engine.get_units_for_player(self.player)
-        enemies = [u for u in engine.units if u.player != self.player and u.alive]
+        seen = engine.perception
+        my_units = seen.units(self.player)
+        enemies = seen.enemies(self.player)
         
         if not enemies or not my_units:
             return
@@ -530,17 +563,21 @@ class GenghisKhanPrimeGeneral(General):
         finish_him = len(enemies) <= 15 or advantage_ratio >= 1.0
 
         # Listes de menaces
-        pikes = [e for e in enemies if e.unit_type == "Pikeman"]
-        knights = [e for e in enemies if e.unit_type == "knight"]
+        pikes = seen.enemies(self.player, PIKEMAN)
+        knights = seen.enemies(self.player, KNIGHT)
+        # Champs de fuite, construits une fois au premier besoin puis partagés
+        melee_field = pike_field = enemy_field = None
         
         for u in my_units:
-            u_type = u.unit_type
+            u_type = u.type_code
 
             # --- 1. ARBALÉTRIERS ---
-            if u_type == "Crossbowman":
+            if u_type == CROSSBOWMAN:
                 # En mode FINISH HIM, on ne fuit plus du tout, on tire juste.
                 if not finish_him:
-                    nearest_threat = self.get_nearest(u, knights + pikes)
+                    if melee_field is None:
+                        melee_field = ThreatField(knights + pikes, 3.5)
+                    nearest_threat = melee_field.nearest(u.x, u.y)
                     if nearest_threat:
                         dist = u.distance_to(nearest_threat)
                         if dist < 3.5:
@@ -551,25 +588,29 @@ class GenghisKhanPrimeGeneral(General):
                                 continue
 
             # --- 2. CHEVALIERS ---
-            if u_type == "knight":
+            if u_type == KNIGHT:
                 # En mode FINISH HIM, on ignore la peur des piquiers.
                 if not finish_him:
-                    nearest_pike = self.get_nearest(u, pikes)
+                    if pike_field is None:
+                        pike_field = ThreatField(pikes, 2.5)
+                    nearest_pike = pike_field.nearest(u.x, u.y)
                     if nearest_pike and u.distance_to(nearest_pike) < 2.5:
                         self.move_away(u, nearest_pike, intensity=2.0)
                         u.target_id = None
                         continue
 
             # --- 3. MOINES ---
-            if u_type == "Monk":
+            if u_type == MONK:
                 # Les moines restent prudents même à la fin (ils ne servent à rien au corps à corps)
-                threat = self.get_nearest(u, enemies)
+                if enemy_field is None:
+                    enemy_field = ThreatField(enemies, 2.5)
+                threat = enemy_field.nearest(u.x, u.y)
                 if threat and u.distance_to(threat) < 2.5:
                     self.move_away(u, threat, intensity=1.0)
                     u.target_id = None
                     continue
                 # Soin
-                allies_hurt = [a for a in my_units if a.hp < a.max_hp]
+                allies_hurt = [a for a in seen.wounded(self.player) if a.hp < a.max_hp]
                 if allies_hurt:
                     u.target_id = min(allies_hurt, key=lambda a: a.hp).id
                 continue
@@ -590,7 +631,7 @@ class GenghisKhanPrimeGeneral(General):
     def choose_target(self, u, enemies, finish_him):
         best_score = -9999
         best_target = None
-        u_type = u.unit_type
+        u_type = u.type_code
 
         for e in enemies:
             dist = u.distance_to(e)
@@ -602,28 +643,28 @@ class GenghisKhanPrimeGeneral(General):
                 score = -dist * 3 
                 if e.hp < 10: score += 50
             
-            e_type = e.unit_type
+            e_type = e.type_code
 
             # --- LOGIQUE DE CONTRE (Désactivée en Finish Him) ---
             if not finish_him:
-                if u_type == "Pikeman":
-                    if e_type == "knight": score += 200
-                    elif e_type == "Pikeman": score += 10
+                if u_type == PIKEMAN:
+                    if e_type == KNIGHT: score += 200
+                    elif e_type == PIKEMAN: score += 10
                     
-                elif u_type == "knight":
-                    if e_type in ["Crossbowman", "Monk", "mage"]: score += 150
+                elif u_type == KNIGHT:
+                    if e_type in (CROSSBOWMAN, MONK, MAGE): score += 150
                     # On évite le piquier SEULEMENT si on n'est pas en train de finir la game
-                    elif e_type == "Pikeman": score -= 500
+                    elif e_type == PIKEMAN: score -= 500
 
-                elif u_type == "Crossbowman":
-                    if e_type == "Pikeman": score += 20 
-                    if e_type == "knight": score += 30
-                    if e_type == "Monk": score += 60
+                elif u_type == CROSSBOWMAN:
+                    if e_type == PIKEMAN: score += 20 
+                    if e_type == KNIGHT: score += 30
+                    if e_type == MONK: score += 60
             
             # En mode Finish Him, on ajoute juste un petit bonus pour taper ce qu'on tape bien
             # Mais sans pénalité négative massive qui empêcherait d'attaquer
             else:
-                if u_type == "Pikeman" and e_type == "knight": score += 50
+                if u_type == PIKEMAN and e_type == KNIGHT: score += 50
 
             if score > best_score:
                 best_score = score
@@ -1,6 +1,6 @@
 import argparse
 from Map import MAP_W, MAP_H
-from typing import List, Dict
+from typing import List, Dict, Optional
 from Engine import SimpleEngine
 from Scenario import square_scenario, chevron_scenario, optimal_scenario, echelon_scenario
 import random
@@ -9,6 +9,8 @@ import time
 from Generals import DaftGeneral, BrainDeadGeneral, New_General_1, New_General_2, New_General_3, GenghisKhanPrimeGeneral
 from Scenario_lanchester import lanchester_scenario
 from battle_plot import generate_lanchester_plot
+from Scheduler import SIM_DT
+from StepProfile import StepProfile
 
 
 def get_ai_class(ai_name: str):
@@ -43,34 +45,89 @@ def get_scenario(scenario_name: str):
     return scenario_map.get(scenario_name, square_scenario)
 
 
-def run_battle(engine: SimpleEngine, generals: Dict, terminal_view: bool = False, datafile: str = None):
-    """Run a single battle and optionally save results to file"""
+def unit_pass_clash(scheduling: str = 'per_tick', sleep_idle: bool = False,
+                    chunk_size: float = 0.0, lod_every: int = 1) -> Optional[str]:
+    """Simple engine options that would be silently dropped together, or None.
+
+    SimpleEngine._unit_pass runs one of the wheel, the chunked world or
+    multi-rate stepping, in that order, and only the wheel also honours
+    sleep_idle.
+    """
+    passes = [name for name, on in (('--scheduling wheel', scheduling == 'wheel'),
+                                    ('--chunk-size', chunk_size > 0),
+                                    ('--lod', lod_every > 1)) if on]
+    if len(passes) > 1:
+        return f"{passes[0]} and {passes[1]} cannot be combined"
+    if sleep_idle and passes and passes[0] != '--scheduling wheel':
+        return f"--sleep-idle and {passes[0]} cannot be combined"
+    return None
+
+
+def get_engine(engine_name: str, collisions: str = 'per_unit', w: int = MAP_W, h: int = MAP_H,
+               scheduling: str = 'per_tick', sleep_idle: bool = False, workers: int = None,
+               chunk_size: float = 0.0, combat: str = 'immediate', lod_every: int = 1):
+    """Get engine instance by backend name (the vector backend always batches collisions)"""
+    clash = unit_pass_clash(scheduling, sleep_idle, chunk_size, lod_every)
+    if engine_name == 'simple' and clash:
+        raise ValueError(clash)
+    if engine_name == 'vector':
+        from VectorEngine import VectorEngine
+        return VectorEngine(w=w, h=h)
+    if engine_name == 'partitioned':
+        from PartitionedEngine import PartitionedEngine
+        engine = PartitionedEngine(w=w, h=h, collisions=collisions)
+        if workers:
+            engine.workers = workers
+        return engine
+    return SimpleEngine(w=w, h=h, collisions=collisions, scheduling=scheduling, sleep_idle=sleep_idle,
+                        chunk_size=chunk_size, combat=combat, lod_every=lod_every)
+
+
+def run_battle(engine: SimpleEngine, generals: Dict, terminal_view: bool = False, datafile: str = None,
+               profile_file: str = None, warp: bool = False):
+    """Run a single battle and optionally save results to file.
+
+    With profile_file, the engine's per-phase timings and counters are
+    written there (JSON for a .json name, CSV otherwise). With warp, the
+    approach phase is fast-forwarded by the engine (SimpleEngine.warp).
+    """
+    if profile_file is not None and getattr(engine, 'profile', None) is None:
+        engine.profile = StepProfile()
     t = 0.0
-    dt = 0.2
+    dt = SIM_DT
     step = 0
     start = time.time()
     max_ticks = 180.0
     
+    warp = warp and hasattr(engine, 'warp')
+    
     # Run the simulation
     while t < max_ticks:
-        engine.step(dt, generals)
-        t += dt
-        step += 1
-        p1 = engine.get_units_for_player(1)
-        p2 = engine.get_units_for_player(2)
-        if not p1 or not p2:
-            winner = 2 if p2 else (1 if p1 else 0)
+        skipped = engine.warp(dt, generals, int((max_ticks - t) / dt)) if warp else 0
+        if skipped:
+            for _ in range(skipped):
+                t += dt
+            step += skipped
+        else:
+            engine.step(dt, generals)
+            t += dt
+            step += 1
+        if engine.is_finished:
+            winner = engine.winner
             break
     else:
         winner = 0  # Draw
     
     simulation_time = time.time() - start
+    close = getattr(engine, 'close', None)
+    if close is not None:
+        close()
     
     # Print results
     print(f"Battle ended at t={t:.1f}s steps={step}. Winner: P{winner}")
     print(f"Simulation took {simulation_time:.2f}s wall time. Engine ticks: {engine.tick:.2f}")
     print("Events:")
-    for e in engine.events[-20:]:
+    for e in engine.events.lines(20):
         print("  ", e)
     
     # Save to file if specified
@@ -79,9 +136,13 @@ def run_battle(engine: SimpleEngine, generals: Dict, terminal_view: bool = False
             f.write(f'Battle ended at t={t:.1f}s steps={step}. Winner: P{winner}\n')
             f.write(f'Simulation took {simulation_time:.2f}s wall time. Engine ticks: {engine.tick:.2f}\n')
             f.write('Events:\n')
-            for event in engine.events:
+            for event in engine.events.lines():
                 f.write(f'   {event}\n')
         print(f'\nBattle data successfully written to {datafile}')
+
+    if profile_file is not None:
+        engine.profile.export(profile_file)
+        print(f'Step profile written to {profile_file}')
     
     return winner, t, step, simulation_time
 
@@ -98,6 +159,15 @@ def main():
     run_parser.add_argument('-t', action='store_true', help='Terminal/headless view (default: 2.5D PyGame)')
     run_parser.add_argument('-d', type=str, help='Data file to save results')
     run_parser.add_argument('--seed', type=int, help='Random seed')
+    run_parser.add_argument('--engine', choices=['simple', 'vector', 'partitioned'], default='simple', help='Simulation backend (default: simple)')
+    run_parser.add_argument('--collisions', choices=['per_unit', 'batched'], default='per_unit', help='Collision pass for the simple engine (default: per_unit)')
+    run_parser.add_argument('--scheduling', choices=['per_tick', 'wheel'], default='per_tick', help='Attack scheduling for the simple engine (default: per_tick)')
+    run_parser.add_argument('--sleep-idle', action='store_true', help='Let idle units with no enemy nearby sleep (simple engine)')
+    run_parser.add_argument('--lod', type=int, default=1, metavar='K', help='Step units with no target and no enemy nearby only every K ticks (simple engine, default: 1)')
+    run_parser.add_argument('--combat', choices=['immediate', 'two_phase'], default='immediate', help='Hits land during each unit step, or all together after the unit pass (simple engine, default: immediate)')
+    run_parser.add_argument('--workers', type=int, help='Worker processes for the partitioned engine (default: all cores)')
+    run_parser.add_argument('--chunk-size', type=float, default=0.0, help='Chunked world: only chunks near an engagement get full steps; pays off on large maps with distant fights, slower on the default map (simple engine, default: off)')
+    run_parser.add_argument('--map-size', type=int, nargs=2, default=[MAP_W, MAP_H], metavar=('W', 'H'), help=f'Map width and height (default: {MAP_W} {MAP_H})')
 
     # load command
     load_parser = subparsers.add_parser('load', help='Load a saved battle')
@@ -110,6 +180,17 @@ def main():
     tourney_parser.add_argument('-N', type=int, default=10, help='Number of rounds per matchup')
     tourney_parser.add_argument('-na', action='store_true', help='Do not alternate positions')
     tourney_parser.add_argument('-d', type=str, help='Data file to save results')
+    tourney_parser.add_argument('--engine', choices=['simple', 'vector', 'partitioned'], default='simple', help='Simulation backend (default: simple)')
+    tourney_parser.add_argument('--collisions', choices=['per_unit', 'batched'], default='per_unit', help='Collision pass for the simple engine (default: per_unit)')
+    tourney_parser.add_argument('--scheduling', choices=['per_tick', 'wheel'], default='per_tick', help='Attack scheduling for the simple engine (default: per_tick)')
+    tourney_parser.add_argument('--sleep-idle', action='store_true', help='Let idle units with no enemy nearby sleep (simple engine)')
+    tourney_parser.add_argument('--lod', type=int, default=1, metavar='K', help='Step units with no target and no enemy nearby only every K ticks (simple engine, default: 1)')
+    tourney_parser.add_argument('--combat', choices=['immediate', 'two_phase'], default='immediate', help='Hits land during each unit step, or all together after the unit pass (simple engine, default: immediate)')
+    tourney_parser.add_argument('--workers', type=int, help='Worker processes for the partitioned engine (default: all cores)')
+    tourney_parser.add_argument('--chunk-size', type=float, default=0.0, help='Chunked world: only chunks near an engagement get full steps; pays off on large maps with distant fights, slower on the default map (simple engine, default: off)')
+    tourney_parser.add_argument('--map-size', type=int, nargs=2, default=[MAP_W, MAP_H], metavar=('W', 'H'), help=f'Map width and height (default: {MAP_W} {MAP_H})')
+    tourney_parser.add_argument('--warp', action='store_true', help='Fast-forward the approach phase of each battle (simple engine)')
+    tourney_parser.add_argument('--profile', type=str, help='Write per-phase step timings and counters of every battle to this CSV/JSON file (simple engine)')
 
     # plot command
     plot_parser = subparsers.add_parser('plot', help='Plot outcomes of a scenario with parameters')
@@ -128,6 +209,10 @@ def main():
     view_parser.add_argument('--seed', type=int, help='Random seed')
 
     args = parser.parse_args()
+    if args.command in ('run', 'tourney') and args.engine == 'simple':
+        clash = unit_pass_clash(args.scheduling, args.sleep_idle, args.chunk_size, args.lod)
+        if clash:
+            parser.error(clash)
 
     # Handle run command
     if args.command == 'run':
@@ -135,7 +220,10 @@ def main():
             random.seed(args.seed)
         
         print('Starting battle simulation...')
-        engine = SimpleEngine(w=MAP_W, h=MAP_H)
+        engine = get_engine(args.engine, args.collisions, scheduling=args.scheduling,
+                            sleep_idle=args.sleep_idle, workers=args.workers,
+                            chunk_size=args.chunk_size, combat=args.combat, lod_every=args.lod,
+                            w=args.map_size[0], h=args.map_size[1])
         scenario_func = get_scenario(args.scenario)
         scenario_func(engine)
         
@@ -208,7 +296,7 @@ def main():
                         elif winner == 2:
                             f.write('Winner: PLAYER 2 (BLUE)\n')
                     f.write('Events:\n')
-                    for event in engine.events:
+                    for event in engine.events.lines():
                         f.write(f'   {event}\n')
                 print(f'Battle data saved to {args.d}')
         else:
@@ -275,7 +363,7 @@ def main():
                         elif winner == 2:
                             f.write('Winner: PLAYER 2 (BLUE)\n')
                     f.write('Events:\n')
-                    for event in engine.events:
+                    for event in engine.events.lines():
                         f.write(f'   {event}\n')
                 print(f'Battle data saved to {args.d}')
 
@@ -356,6 +444,7 @@ def main():
         
         results = {}
         total_matches = 0
+        profile = StepProfile() if args.profile else None
         
         for scenario_name in args.S:
             for i, ai1 in enumerate(args.G):
@@ -364,7 +453,10 @@ def main():
                     results[matchup] = {'ai1_wins': 0, 'ai2_wins': 0, 'draws': 0}
                     
                     for round_num in range(args.N):
-                        engine = SimpleEngine(w=MAP_W, h=MAP_H)
+                        engine = get_engine(args.engine, args.collisions, scheduling=args.scheduling,
+                            sleep_idle=args.sleep_idle, workers=args.workers,
+                            chunk_size=args.chunk_size, combat=args.combat, lod_every=args.lod,
+                            w=args.map_size[0], h=args.map_size[1])
                         scenario_func = get_scenario(scenario_name)
                         scenario_func(engine)
                         
@@ -382,7 +474,10 @@ def main():
                             }
                             p1_ai, p2_ai = ai2, ai1
                         
-                        winner, t, step, sim_time = run_battle(engine, generals, datafile=None)
+                        if profile is not None and hasattr(engine, 'profile'):
+                            profile.new_battle()
+                            engine.profile = profile
+                        winner, t, step, sim_time = run_battle(engine, generals, datafile=None, warp=args.warp)
                         
                         if winner == 0:
                             results[matchup]['draws'] += 1
@@ -411,6 +506,10 @@ def main():
                     f.write(f"{matchup}: {stats['ai1_wins']}-{stats['ai2_wins']}-{stats['draws']}\n")
             print(f"\nTournament results saved to {args.d}")
 
+        if profile is not None:
+            profile.export(args.profile)
+            print(f"Step profile of {profile.battle} battles saved to {args.profile}")
+
     # Handle plot command
     elif args.command == 'plot':
         # The units and range_values get combined when parsed, we need to separate them
@@ -509,6 +608,7 @@ def main():
                                 engine.units.append(u)
                                 engine.units_by_id[u.id] = u
                                 engine.next_unit_id += 1
+                        engine.reindex()
                         
                         # Run battle
                         t = 0.0
@@ -520,14 +620,12 @@ def main():
                         while t < max_ticks:
                             engine.step(dt, generals)
                             t += dt
-                            p1 = engine.get_units_for_player(1)
-                            p2 = engine.get_units_for_player(2)
-                            if not p1 or not p2:
+                            if engine.is_finished:
                                 break
                         
                         # Check winner
-                        p1_alive = len(engine.get_units_for_player(1))
-                        p2_alive = len(engine.get_units_for_player(2))
+                        p1_alive = engine.alive_count(1)
+                        p2_alive = engine.alive_count(2)
                         
                         if p1_alive > 0:
                             win_count += 1
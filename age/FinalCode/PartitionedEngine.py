@@ -0,0 +1,397 @@
+"""
+Domain-decomposed engine: the map is cut into vertical strips, each stepped by
+its own worker process, while the parent process keeps a full SimpleEngine
+mirror of the battle for the generals, the renderers and run_battle.
+"""
+from dataclasses import dataclass, field
+import multiprocessing as mp
+import os
+import time
+import weakref
+from typing import Dict, List, Optional
+from Engine import SimpleEngine
+from Units import Unit
+from Separation import separate_units
+from Generals import General
+from StepProfile import StepProfile
+
+# Fields shipped when a unit is handed to a worker, as owner or as ghost
+STATE_FIELDS = ('id', 'player', 'x', 'y', 'hp', 'max_hp', 'attack', 'armor', 'range', 'speed',
+                'alive', 'target_id', 'regen', 'reload_time', 'reload_timer', 'unit_type', 'radius')
+
+
+def _state(u: Unit) -> tuple:
+    return (u.id, u.player, u.x, u.y, u.hp, u.max_hp, u.attack, u.armor, u.range, u.speed,
+            u.alive, u.target_id, u.regen, u.reload_time, u.reload_timer, u.unit_type, u.radius)
+
+
+@dataclass
+class PartitionedEngine(SimpleEngine):
+    """SimpleEngine whose unit pass runs in `workers` processes.
+
+    Every live unit is owned by the strip its x falls in. Each tick the
+    parent runs the generals on its own copy of the units, then sends each
+    worker the orders given to its units, the units that migrated into its
+    strip, and the ghost copies of the units it can see: those of the
+    neighbouring strips within `ghost_margin` of the border, plus any
+    target of its own units owned elsewhere. Workers keep their ghosts
+    between ticks, so only the ghosts that appeared, changed or left are
+    sent. Workers step their own units only; damage or heals landed on a
+    ghost come back as hp deltas that the parent applies to the owner's
+    copy and sends on to the owning worker with the next tick's orders, and
+    deaths are settled there. A unit killed by deltas summed
+    across strips is credited to the lowest id that hit it.
+
+    Differences with SimpleEngine: hits across a border land at the end of
+    the tick (so a unit killed there still strikes this tick), monks only
+    see wounded allies in their strip and its ghost band, and the
+    scheduling and sleep modes are not used by the workers.
+    """
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    # Reach of anything a unit can do in one tick: monk range, melee margin, collisions
+    ghost_margin: float = 12.0
+    strips: int = 0
+    _conns: list = field(default_factory=list, repr=False)
+    _finalizer: Optional[weakref.finalize] = field(default=None, repr=False)
+    # Unit id -> strip of its owning worker
+    _owner: Dict[int, int] = field(default_factory=dict, repr=False)
+    # Unit id -> (x, y, hp, target_id, reload_timer) as last reported by its owner,
+    # before the parent merges ghost hits: any difference is sent back as an order
+    _synced: Dict[int, tuple] = field(default_factory=dict, repr=False)
+    _released: Dict[int, List[int]] = field(default_factory=dict, repr=False)
+    # Per strip, ghost id -> (x, y, hp, max_hp, armor) as last sent (None: send it whole again)
+    _ghosted: Dict[int, Dict[int, Optional[tuple]]] = field(default_factory=dict, repr=False)
+
+    def reindex(self, rebuild_grid: bool = True):
+        super().reindex(rebuild_grid)
+        # Units were edited by hand: hand every one over again
+        for s, ids in self._released.items():
+            ids.extend(uid for uid, owner in self._owner.items() if owner == s)
+        self._owner.clear()
+        self._synced.clear()
+        for sent in self._ghosted.values():
+            for uid in sent:
+                sent[uid] = None
+
+    def step(self, dt: float, generals: Dict[int, "General"]):
+        if self.profile is not None:
+            self._step_profiled(dt, generals, self.profile)
+            return
+        self.tick += dt
+        self.steps += 1
+        for pid, gen in generals.items():
+            gen.give_orders(self)
+        if not self._conns:
+            self._start()
+
+        replies = self._exchange(dt)
+        self._merge(replies)
+        if self.dead_pending:
+            self.compact()
+        self.grid.refresh(self.units)
+
+    def warp(self, dt: float, generals: Dict[int, "General"], max_steps: int) -> int:
+        """Never warps: workers step against ghosts as they stood at the start
+        of the tick, an order the parent's replay would not follow."""
+        return 0
+
+    def _step_profiled(self, dt: float, generals: Dict[int, "General"], prof: StepProfile):
+        """`step` with its phases timed into `prof`. The workers' pass (sending,
+        stepping, replies) is all "units"; settling their results is "combat"."""
+        clock = time.perf_counter
+        prof.begin_tick(self.tick + dt)
+        deaths = self.events.total
+        self.tick += dt
+        self.steps += 1
+        t = clock()
+        for pid, gen in generals.items():
+            gen.give_orders(self)
+            now = clock()
+            prof.add_general(pid, now - t)
+            prof.add('generals', now - t)
+            t = now
+        if not self._conns:
+            self._start()
+        replies = self._exchange(dt)
+        now = clock()
+        prof.add('units', now - t)
+        t = now
+        self._merge(replies)
+        now = clock()
+        prof.add('combat', now - t)
+        t = now
+        if self.dead_pending:
+            self.compact()
+        now = clock()
+        prof.add('compaction', now - t)
+        t = now
+        self.grid.refresh(self.units)
+        prof.add('grid', clock() - t)
+        prof.deaths += self.events.total - deaths
+        prof.end_tick()
+
+    def close(self):
+        """Stop the worker processes (also done when the engine is collected),
+        then close the event log."""
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._conns = []
+        self._owner.clear()
+        self._synced.clear()
+        self._released.clear()
+        self._ghosted.clear()
+        super().close()
+
+    # --------------------------
+    # Internals
+    # --------------------------
+    def _start(self):
+        self.strips = max(1, min(self.workers, int(self.w // self.ghost_margin)))
+        procs = []
+        for _ in range(self.strips):
+            parent, child = mp.Pipe()
+            p = mp.Process(target=_strip_worker, args=(child, self.w, self.h, self.collisions), daemon=True)
+            p.start()
+            child.close()
+            self._conns.append(parent)
+            procs.append(p)
+        self._released = {s: [] for s in range(self.strips)}
+        self._ghosted = {s: {} for s in range(self.strips)}
+        self._finalizer = weakref.finalize(self, _shutdown, list(self._conns), procs)
+
+    def _strip_of(self, x: float) -> int:
+        s = int(x * self.strips / self.w)
+        return 0 if s < 0 else (s if s < self.strips else self.strips - 1)
+
+    def _exchange(self, dt: float) -> list:
+        """Send every worker its tick and collect the replies."""
+        k = self.strips
+        width = self.w / k
+        margin = self.ghost_margin
+        owner, synced = self._owner, self._synced
+        adopt = [[] for _ in range(k)]
+        orders = [[] for _ in range(k)]
+        # Per strip, the units it must see this tick as ghosts
+        band: List[Dict[int, Unit]] = [{} for _ in range(k)]
+
+        for u in self.units:
+            if not u.alive:
+                continue
+            s = self._strip_of(u.x)
+            old = owner.get(u.id)
+            if old != s:
+                # Handoff: the new owner gets the full state, the old one drops its copy
+                if old is not None:
+                    self._released[old].append(u.id)
+                owner[u.id] = s
+                adopt[s].append(_state(u))
+            else:
+                now = (u.x, u.y, u.hp, u.target_id, u.reload_timer)
+                if synced.get(u.id) != now:
+                    orders[s].append(now + (u.id,))
+            left = u.x - s * width
+            if s > 0 and left < margin:
+                band[s - 1][u.id] = u
+            if s < k - 1 and width - left < margin:
+                band[s + 1][u.id] = u
+
+        # Targets owned by another strip: the only cross-border synchronisation
+        by_id = self.units_by_id
+        for u in self.units:
+            if u.alive and u.target_id is not None:
+                t = by_id.get(u.target_id)
+                if t is not None and t.alive:
+                    s = owner[u.id]
+                    if owner[t.id] != s:
+                        band[s][t.id] = t
+
+        for s, conn in enumerate(self._conns):
+            # Only what differs from the worker's ghosts goes down the pipe
+            sent = self._ghosted[s]
+            seen = band[s]
+            fresh, moved = [], []
+            gone = [uid for uid in sent if uid not in seen]
+            for uid in gone:
+                del sent[uid]
+            for uid, u in seen.items():
+                now = (u.x, u.y, u.hp, u.max_hp, u.armor)
+                last = sent.get(uid)
+                if last is None:
+                    fresh.append(_state(u))
+                elif last != now:
+                    moved.append((uid,) + now)
+                else:
+                    continue
+                sent[uid] = now
+            conn.send((dt, self.tick, self._released[s], adopt[s], orders[s], fresh, moved, gone))
+            self._released[s] = []
+        return [conn.recv() for conn in self._conns]
+
+    def _merge(self, replies: list):
+        """Fold the workers' results back into the parent's units."""
+        by_id = self.units_by_id
+        killers: Dict[int, Optional[int]] = {}
+        # Lowest id that hit each ghost, over all the strips
+        hitters: Dict[int, int] = {}
+        synced = self._synced
+        for states, deltas, deaths in replies:
+            for uid, x, y, hp, alive, target_id, reload_timer in states:
+                u = by_id[uid]
+                u.x, u.y, u.hp, u.target_id, u.reload_timer = x, y, hp, target_id, reload_timer
+                if not alive:
+                    u.hp = 0
+                synced[uid] = (x, y, u.hp, target_id, reload_timer)
+            for uid, killer in deaths:
+                killers.setdefault(uid, killer)
+        for states, deltas, deaths in replies:
+            for uid, delta, hitter in deltas:
+                if hitter >= 0 and hitter < hitters.get(uid, hitter + 1):
+                    hitters[uid] = hitter
+                u = by_id.get(uid)
+                if u is not None and u.hp > 0:
+                    u.hp = min(u.hp + delta, u.max_hp)
+
+        dead = sorted(u.id for u in self.units if u.alive and u.hp <= 0)
+        # No worker saw these deaths when the hits came from several strips
+        killer_units = {uid: by_id.get(killers.get(uid, hitters.get(uid))) for uid in dead}
+        for uid in dead:
+            u = by_id[uid]
+            u.alive = False
+            u.hp = 0
+            self.mark_dead(u, killer_units[uid])
+            self._released[self._owner.pop(uid)].append(uid)
+            synced.pop(uid, None)
+
+        for u in self.units:
+            if u.alive and u.hp < u.max_hp:
+                self.note_damage(u)
+
+
+def _shutdown(conns: list, procs: list):
+    for conn in conns:
+        try:
+            conn.send(None)
+            conn.close()
+        except (OSError, BrokenPipeError):
+            pass
+    for p in procs:
+        p.join(timeout=1.0)
+        if p.is_alive():
+            p.terminate()
+
+
+# --------------------------
+# Worker side
+# --------------------------
+def _drop(local: SimpleEngine, u: Unit):
+    local.grid.remove(u)
+    if local.units_by_id.get(u.id) is u:
+        del local.units_by_id[u.id]
+    local.wounded.get(u.player, {}).pop(u.id, None)
+
+
+def _add(local: SimpleEngine, state: tuple) -> Unit:
+    u = Unit(**dict(zip(STATE_FIELDS, state)))
+    local.units_by_id[u.id] = u
+    local.grid.insert(u)
+    if u.hp < u.max_hp:
+        local.note_damage(u)
+    return u
+
+
+def _strip_worker(conn, w: int, h: int, collisions: str):
+    """Loop of one worker: owns the units of a strip and steps them."""
+    local = SimpleEngine(w=w, h=h, collisions=collisions)
+    owned: Dict[int, Unit] = {}
+    ghosts: Dict[int, Unit] = {}
+    order: List[Unit] = []
+    ghost_order: List[Unit] = []
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        dt, tick, release, adopt, orders, fresh, moved, gone = msg
+        local.tick = tick
+        local.events.buffer.clear()
+
+        for uid in release:
+            u = owned.pop(uid, None)
+            if u is not None:
+                _drop(local, u)
+        # Ghosts gone first: a dead one's slot may come back with a new unit
+        for uid in gone:
+            g = ghosts.pop(uid, None)
+            if g is not None:
+                _drop(local, g)
+        for state in adopt:
+            g = ghosts.pop(state[0], None)
+            if g is not None:
+                _drop(local, g)
+            owned[state[0]] = _add(local, state)
+        if release or adopt:
+            order = sorted(owned.values(), key=lambda u: u.id)
+        for x, y, hp, target_id, reload_timer, uid in orders:
+            u = owned[uid]
+            u.x, u.y, u.hp, u.target_id, u.reload_timer = x, y, hp, target_id, reload_timer
+            if hp < u.max_hp:
+                local.note_damage(u)
+
+        # Ghosts persist between ticks: only changes come from the parent
+        for state in fresh:
+            g = ghosts.pop(state[0], None)
+            if g is not None:
+                _drop(local, g)
+            ghosts[state[0]] = _add(local, state)
+        for uid, x, y, hp, max_hp, armor in moved:
+            g = ghosts[uid]
+            g.x, g.y, g.hp, g.max_hp, g.armor = x, y, hp, max_hp, armor
+            if hp < max_hp:
+                local.note_damage(g)
+        if adopt or gone or fresh:
+            ghost_order = sorted(ghosts.values(), key=lambda g: g.id)
+        before = {g.id: (g.x, g.y, g.hp) for g in ghosts.values()}
+
+        local.units = order + ghost_order
+        local.grid.refresh(local.units)
+        if collisions == "batched":
+            # Ghosts are pushed too, but only the owners' copies are kept
+            for u in separate_units(local.units):
+                local.grid.update(u)
+        # Lowest id whose step took hp off each ghost (hits land on the attacker's target)
+        hitters: Dict[int, int] = {}
+        seen = {uid: state[2] for uid, state in before.items()}
+        for u in order:
+            if u.alive:
+                u.step(dt, local)
+                if u.alive:
+                    local.grid.update(u)
+                g = ghosts.get(u.target_id)
+                if g is not None:
+                    if g.hp < seen[g.id]:
+                        hitters.setdefault(g.id, u.id)
+                    seen[g.id] = g.hp
+        local.dead_pending = 0
+
+        states = [(u.id, u.x, u.y, u.hp, u.alive, u.target_id, u.reload_timer) for u in order]
+        deltas = [(g.id, g.hp - before[g.id][2], hitters.get(g.id, -1))
+                  for g in ghosts.values() if g.hp != before[g.id][2]]
+        deaths = [(e.unit_id, e.killer_id) for e in local.events]
+        # Put the ghosts back as the parent sent them: it applies the deltas
+        # and sends whatever changed next tick
+        # (the grid catches up on the next refresh)
+        for g in ghosts.values():
+            g.x, g.y, g.hp = before[g.id]
+            if not g.alive:
+                g.alive = True
+                local.units_by_id[g.id] = g
+            if g.hp < g.max_hp:
+                local.note_damage(g)
+        conn.send((states, deltas, deaths))
+
+        died = [u for u in order if not u.alive]
+        for u in died:
+            del owned[u.id]
+        if died:
+            order = [u for u in order if u.alive]
+    conn.close()
@@ -0,0 +1,101 @@
+"""
+What the generals see of the battle during one tick: unit lists, per-type
+buckets and aggregates, computed on first request and shared by every general
+"""
+from typing import Dict, List, Optional, Tuple, Union
+from Units import Unit
+from UnitTypes import get_type
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+UnitType = Union[str, int, None]
+
+
+class Perception:
+    """Lazy per-tick view of an engine (SimpleEngine, VectorEngine...).
+
+    Engines hand out one per tick through their `perception` property, so
+    whatever a general asks for is computed once for all the generals of
+    that tick, and nothing is computed that nobody asks for.
+
+    Lists are shared: read them, don't modify them. The membership of every
+    list holds for the whole tick, since nobody dies while generals give
+    orders. Aggregates over positions (`centroid`) are taken when first
+    asked for, so a general reading its own army's before moving units
+    sees what it would have computed itself.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.tick = engine.tick
+        self._units: Dict[Tuple[int, int], List[Unit]] = {}
+        self._enemies: Dict[Tuple[int, int], List[Unit]] = {}
+        self._centroids: Dict[int, Tuple[float, float]] = {}
+        self._wounded: Dict[int, List[Unit]] = {}
+        self._attackers: Dict[int, Dict[int, int]] = {}
+        self._enemy_positions: Dict[int, tuple] = {}
+
+    def units(self, player: int, unit_type: UnitType = None) -> List[Unit]:
+        """Live units of `player`, optionally of one type, in spawn order."""
+        key = (player, -1 if unit_type is None else get_type(unit_type).code)
+        units = self._units.get(key)
+        if units is None:
+            units = self._units[key] = self.engine.get_units_for_player(player, unit_type)
+        return units
+
+    def enemies(self, player: int, unit_type: UnitType = None) -> List[Unit]:
+        """Live units of every other player, optionally of one type."""
+        key = (player, -1 if unit_type is None else get_type(unit_type).code)
+        enemies = self._enemies.get(key)
+        if enemies is None:
+            enemies = self._enemies[key] = self.engine.get_enemies_of(player, unit_type)
+        return enemies
+
+    def enemy_positions(self, player: int):
+        """(xs, ys) NumPy arrays of enemies(player)'s coordinates, in list order,
+        for batched distance work."""
+        if np is None:
+            raise RuntimeError("NumPy not installed.")
+        pos = self._enemy_positions.get(player)
+        if pos is None:
+            enemies = self.enemies(player)
+            pos = self._enemy_positions[player] = (
+                np.fromiter((e.x for e in enemies), dtype=np.float64, count=len(enemies)),
+                np.fromiter((e.y for e in enemies), dtype=np.float64, count=len(enemies)))
+        return pos
+
+    def centroid(self, player: int) -> Optional[Tuple[float, float]]:
+        """Centre of mass of a player's army, None if it has no units left."""
+        if player not in self._centroids:
+            units = self.units(player)
+            if not units:
+                return None
+            self._centroids[player] = (sum(u.x for u in units) / len(units),
+                                       sum(u.y for u in units) / len(units))
+        return self._centroids[player]
+
+    def wounded(self, player: int) -> List[Unit]:
+        """A player's units below max hp, as engine.wounded_allies orders them.
+
+        Heals given during the tick don't remove anyone: filter on hp.
+        """
+        wounded = self._wounded.get(player)
+        if wounded is None:
+            wounded = self._wounded[player] = self.engine.wounded_allies(player)
+        return wounded
+
+    def attackers(self, player: int) -> Dict[int, int]:
+        """Target id -> number of `player`'s units aiming at it.
+
+        Taken from the targets as they were at the first request; copy it
+        to keep count of the targets you hand out.
+        """
+        counts = self._attackers.get(player)
+        if counts is None:
+            counts = self._attackers[player] = {}
+            for u in self.units(player):
+                if u.target_id is not None:
+                    counts[u.target_id] = counts.get(u.target_id, 0) + 1
+        return counts
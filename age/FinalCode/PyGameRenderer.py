@@ -6,6 +6,7 @@ from Units import Unit
 from Map import TILE_SIZE, MAP_W, MAP_H
 from GameState import GameStateManager
 from DebugInfo import DebugInfoGenerator
+from Scheduler import FixedStepScheduler
 import os
 import math
 SCREEN_W, SCREEN_H = 960, 640
@@ -33,6 +34,7 @@ class PygameRenderer:
         self.speed_multiplier = 1.0
         self.paused = False
         self.show_minimap = True
+        self.scheduler = FixedStepScheduler(engine)
         
         # Zoom
         self.zoom = 1.0
@@ -96,7 +98,7 @@ class PygameRenderer:
 
     def get_unit_direction(self, unit: Unit) -> str:
         """Determine which direction the unit is facing based on target or last movement"""
-        if not hasattr(unit, 'last_x'):
+        if unit.last_x is None:
             unit.last_x = unit.x
             unit.last_y = unit.y
         
@@ -156,22 +158,11 @@ class PygameRenderer:
             t = self.tile_size()
             sx, sy = self.world_to_screen(u.x, u.y)
             
-            # Get unit type (normalize name)
-            unit_type = u.unit_type
-            if unit_type.lower().startswith('pik'):
-                unit_type = 'Pikeman'
-            elif unit_type.lower().startswith('cross'):
-                unit_type = 'Crossbowman'
-            elif unit_type.lower().startswith('knight'):
-                unit_type = 'Knight'
-            elif unit_type.lower().startswith('monk'):
-                unit_type = 'Monk'
-            
             # Get direction
             direction = self.get_unit_direction(u)
             
             # Try to use texture, fallback to circle
-            texture_key = (unit_type, u.player, direction)
+            texture_key = (u.unit_type, u.player, direction)
             if texture_key in self.unit_textures:
                 sprite = pygame.transform.scale(self.unit_textures[texture_key], (t, t))
                 self.screen.blit(sprite, (sx, sy))
@@ -214,8 +205,8 @@ class PygameRenderer:
         # Army info (F1)
         if self.show_army_info:
             y_offset = 30
-            p1_units = len(self.engine.get_units_for_player(1))
-            p2_units = len(self.engine.get_units_for_player(2))
+            p1_units = self.engine.alive_count(1)
+            p2_units = self.engine.alive_count(2)
             
             p1_txt = font_small.render(f"Player 1 (Red): {p1_units} units", True, (255,100,100))
             p2_txt = font_small.render(f"Player 2 (Blue): {p2_units} units", True, (100,150,255))
@@ -262,16 +253,10 @@ class PygameRenderer:
         if self.game_over:
             return
         
-        p1_alive = len(self.engine.get_units_for_player(1))
-        p2_alive = len(self.engine.get_units_for_player(2))
-        
-        if p1_alive == 0 and p2_alive > 0:
-            self.game_over = True
-            self.winner = 2
-            self.game_over_tick = self.engine.tick
-        elif p2_alive == 0 and p1_alive > 0:
+        # A draw (both sides wiped out) does not end the view
+        if self.engine.is_finished and self.engine.winner:
             self.game_over = True
-            self.winner = 1
+            self.winner = self.engine.winner
             self.game_over_tick = self.engine.tick
     
     def draw_game_over_screen(self):
@@ -510,9 +495,7 @@ class PygameRenderer:
             
             # Update simulation if not paused and game is not over
             if not self.paused and not self.game_over:
-                sim_dt = dt_real * self.speed_multiplier
-                sim_dt = min(sim_dt, 0.5)
-                self.engine.step(sim_dt, self.generals)
+                self.scheduler.advance(dt_real * self.speed_multiplier, self.generals)
             
             # Render
             self.screen.fill((0,0,0))
@@ -1,14 +1,17 @@
+from UnitTypes import CROSSBOWMAN, KNIGHT, get_type
+from Formations import block
+
 def lanchester_scenario(engine, unit_type, N):
     """Validation scientifique (Section 69.3)."""
-    stats = {
-        "Crossbowman": {"hp": 35, "attack": 5, "reload_time": 2.0, "range": 5.0, "speed": 0.96, "tags": ["archer"]},
-        "knight": {"hp": 100, "attack": 10, "reload_time": 1.8, "armor": 2, "range": 1.0, "speed": 1.35, "tags": ["Cavalry"]},
-    }
-    u_stats = stats.get(unit_type, stats["knight"])
+    # Seuls arbalétriers et chevaliers sont calibrés ; tout autre type prend les stats du chevalier
+    # mais garde ses propres tags et bonus du registre (avant : tags "Cavalry", aucun bonus)
+    u_type = get_type(unit_type)
+    u_stats = (u_type if u_type.code in (CROSSBOWMAN, KNIGHT) else get_type(KNIGHT)).stats()
     # Engagement immÃ©diat
     x_p1, x_p2 = 20.0, 21.2 
 
-    for i in range(N):
-        engine.spawn_unit(player=1, x=x_p1 - (i%5)*0.6, y=30 + (i//5)*0.6, unit_type=unit_type, **u_stats)
-    for i in range(2 * N):
-        engine.spawn_unit(player=2, x=x_p2 + (i%5)*0.6, y=30 + (i//5)*0.6, unit_type=unit_type, **u_stats)
+    # Rangs de 5 : chaque armée s'étend vers l'arrière, face à l'autre
+    xs, ys = block(N, 5, (x_p1, 30), column_step=(0.0, 0.6), row_step=(-0.6, 0.0))
+    engine.spawn_units(1, xs, ys, unit_type=unit_type, **u_stats)
+    xs, ys = block(2 * N, 5, (x_p2, 30), column_step=(0.0, 0.6), row_step=(0.6, 0.0))
+    engine.spawn_units(2, xs, ys, unit_type=unit_type, **u_stats)
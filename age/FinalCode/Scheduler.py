@@ -0,0 +1,73 @@
+"""
+Fixed-timestep scheduler: turns variable frame times into whole engine ticks
+"""
+from typing import Dict
+from Generals import General
+
+# Simulation tick shared by the headless runners and the interactive views
+SIM_DT = 0.2
+
+
+class FixedStepScheduler:
+    """Accumulates real (speed-scaled) time and steps the engine in fixed ticks.
+
+    A frame shorter than one tick does no simulation work; a long or
+    sped-up frame runs several ticks. At most `max_steps` ticks run per
+    frame so a slow machine drops time instead of falling further behind.
+    """
+
+    def __init__(self, engine, dt: float = SIM_DT, max_steps: int = 8):
+        self.engine = engine
+        self.dt = dt
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+
+    def advance(self, elapsed: float, generals: Dict[int, General]) -> int:
+        """Add `elapsed` seconds of game time and run the ticks now due."""
+        self.accumulator += elapsed
+        steps = 0
+        while self.accumulator >= self.dt and steps < self.max_steps:
+            self.engine.step(self.dt, generals)
+            self.accumulator -= self.dt
+            steps += 1
+        if self.accumulator >= self.dt:
+            # Too far behind: keep the partial tick, drop the rest
+            self.accumulator %= self.dt
+        return steps
+
+    def reset(self):
+        self.accumulator = 0.0
+
+
+class TimingWheel:
+    """Hashed timing wheel counting whole engine ticks.
+
+    `schedule(item, delay)` files an item `delay` ticks ahead; each
+    `advance()` moves one tick on and returns the items due on it. Items
+    further out than one turn of the wheel wait in their slot for the
+    extra turns, so the cost per tick is the number of items in one slot.
+    """
+
+    def __init__(self, size: int = 64):
+        self.size = size
+        self.slots = [[] for _ in range(size)]
+        self.now = 0
+
+    def schedule(self, item, delay: int) -> int:
+        """File `item` to come due `delay` (>= 1) ticks from now; returns that tick."""
+        due = self.now + max(1, delay)
+        self.slots[due % self.size].append((due, item))
+        return due
+
+    def advance(self) -> list:
+        self.now += 1
+        slot = self.slots[self.now % self.size]
+        if not slot:
+            return []
+        due = [item for when, item in slot if when == self.now]
+        slot[:] = [entry for entry in slot if entry[0] > self.now]
+        return due
+
+    def clear(self):
+        for slot in self.slots:
+            slot.clear()
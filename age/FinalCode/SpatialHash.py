@@ -0,0 +1,228 @@
+"""
+Uniform-grid spatial hash used by the engine for proximity queries
+"""
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+from Units import Unit
+
+Cell = Tuple[int, int]
+Layer = Dict[Cell, Dict[int, Unit]]
+
+
+class SpatialHash:
+    """Buckets live units into square cells of `cell_size` world units.
+
+    Each player gets its own layer of cells so "enemies of P" / "allies of P"
+    queries never touch the other side's units.
+
+    Units may be moved by anyone (Unit.step, generals, collisions) without
+    telling the grid; the engine calls `update`/`refresh` to re-bucket them.
+    Queries widen their cell coverage by `slack` so a unit that drifted a
+    little since its last refresh is still found, and the final distance
+    test always uses the unit's current coordinates.
+    """
+
+    def __init__(self, cell_size: float = 2.0, slack: float = 1.0):
+        self.cell_size = cell_size
+        self.slack = slack
+        self.layers: Dict[int, Layer] = {}
+        # id -> [player, cell, x, y] as of the unit's last insert/update
+        self.unit_cells: Dict[int, list] = {}
+        self.max_radius = 0.0
+        # Occupied cell bounds (only ever grow) to stop nearest() ring search
+        self.min_cx = self.min_cy = 0
+        self.max_cx = self.max_cy = -1
+        # StepProfile counting the distances queries evaluate, while the engine profiles a step
+        self.profile = None
+
+    def cell_of(self, x: float, y: float) -> Cell:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    # --------------------------
+    # Maintenance
+    # --------------------------
+    def insert(self, u: Unit):
+        c = self.cell_of(u.x, u.y)
+        self.layers.setdefault(u.player, {}).setdefault(c, {})[u.id] = u
+        self.unit_cells[u.id] = [u.player, c, u.x, u.y]
+        if u.radius > self.max_radius:
+            self.max_radius = u.radius
+        if self.max_cx < self.min_cx:
+            self.min_cx, self.max_cx = c[0], c[0]
+            self.min_cy, self.max_cy = c[1], c[1]
+        else:
+            self.min_cx = min(self.min_cx, c[0])
+            self.max_cx = max(self.max_cx, c[0])
+            self.min_cy = min(self.min_cy, c[1])
+            self.max_cy = max(self.max_cy, c[1])
+
+    def insert_many(self, units: List[Unit]):
+        """`insert` for a batch of new units (bulk spawns)."""
+        if not units:
+            return
+        size = self.cell_size
+        floor = math.floor
+        unit_cells = self.unit_cells
+        cxs, cys = [], []
+        for u in units:
+            c = (floor(u.x / size), floor(u.y / size))
+            self.layers.setdefault(u.player, {}).setdefault(c, {})[u.id] = u
+            unit_cells[u.id] = [u.player, c, u.x, u.y]
+            cxs.append(c[0])
+            cys.append(c[1])
+        self.max_radius = max(self.max_radius, max(u.radius for u in units))
+        if self.max_cx < self.min_cx:
+            self.min_cx, self.max_cx = min(cxs), max(cxs)
+            self.min_cy, self.max_cy = min(cys), max(cys)
+        else:
+            self.min_cx = min(self.min_cx, min(cxs))
+            self.max_cx = max(self.max_cx, max(cxs))
+            self.min_cy = min(self.min_cy, min(cys))
+            self.max_cy = max(self.max_cy, max(cys))
+
+    def remove(self, u: Unit):
+        entry = self.unit_cells.pop(u.id, None)
+        if entry is None:
+            return
+        player, c = entry[0], entry[1]
+        layer = self.layers[player]
+        bucket = layer.get(c)
+        if bucket is not None:
+            bucket.pop(u.id, None)
+            if not bucket:
+                del layer[c]
+
+    def update(self, u: Unit) -> bool:
+        """Re-bucket a unit if it left its cell; True if it moved at all since
+        the last update."""
+        entry = self.unit_cells.get(u.id)
+        if entry is not None and entry[0] == u.player and self.layers[entry[0]][entry[1]].get(u.id) is u:
+            if entry[2] == u.x and entry[3] == u.y:
+                return False
+            if entry[1] == self.cell_of(u.x, u.y):
+                entry[2], entry[3] = u.x, u.y
+                return True
+        self.remove(u)
+        self.insert(u)
+        return True
+
+    def refresh(self, units: List[Unit]) -> List[Unit]:
+        """Update every live unit; returns the ones that moved."""
+        return [u for u in units if u.alive and self.update(u)]
+
+    def rebuild(self, units: List[Unit]):
+        self.clear()
+        for u in units:
+            if u.alive:
+                self.insert(u)
+
+    def clear(self):
+        self.layers.clear()
+        self.unit_cells.clear()
+        self.max_radius = 0.0
+        self.min_cx = self.min_cy = 0
+        self.max_cx = self.max_cy = -1
+
+    # --------------------------
+    # Queries
+    # --------------------------
+    def _select(self, player: Optional[int], enemy_of: Optional[int]) -> List[Layer]:
+        if player is not None:
+            layer = self.layers.get(player)
+            return [layer] if layer else []
+        if enemy_of is not None:
+            return [layer for p, layer in self.layers.items() if p != enemy_of and layer]
+        return [layer for layer in self.layers.values() if layer]
+
+    def query_radius(self, x: float, y: float, r: float,
+                     predicate: Optional[Callable[[Unit], bool]] = None,
+                     player: Optional[int] = None,
+                     enemy_of: Optional[int] = None) -> List[Unit]:
+        """Live units with distance <= r from (x, y), ordered by id.
+
+        `player` keeps only that player's units, `enemy_of` keeps everyone else's.
+        """
+        layers = self._select(player, enemy_of)
+        if not layers:
+            return []
+        cs = self.cell_size
+        reach = r + self.slack
+        cx0, cy0 = math.floor((x - reach) / cs), math.floor((y - reach) / cs)
+        cx1, cy1 = math.floor((x + reach) / cs), math.floor((y + reach) / cs)
+        found = []
+        checked = 0
+        for layer in layers:
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    bucket = layer.get((cx, cy))
+                    if not bucket:
+                        continue
+                    checked += len(bucket)
+                    for u in bucket.values():
+                        if not u.alive or math.hypot(u.x - x, u.y - y) > r:
+                            continue
+                        if predicate is None or predicate(u):
+                            found.append(u)
+        if self.profile is not None:
+            self.profile.distance_evals += checked
+        found.sort(key=lambda u: u.id)
+        return found
+
+    def nearest(self, x: float, y: float, k: int = 1,
+                predicate: Optional[Callable[[Unit], bool]] = None,
+                max_dist: float = math.inf,
+                player: Optional[int] = None,
+                enemy_of: Optional[int] = None) -> List[Unit]:
+        """Up to k live units closest to (x, y); ties go to the lowest id,
+        which matches min() over the engine's unit list while no id has been
+        recycled (see UnitSlots)."""
+        layers = self._select(player, enemy_of)
+        if not layers:
+            return []
+        cs = self.cell_size
+        cx, cy = self.cell_of(x, y)
+        last_ring = max(cx - self.min_cx, self.max_cx - cx, cy - self.min_cy, self.max_cy - cy, 0)
+        occupied = sum(len(layer) for layer in layers)
+        best: List[Tuple[float, int, Unit]] = []
+        checked = 0
+
+        ring = 0
+        while ring <= last_ring:
+            # Anything in this ring or beyond is at least this far away
+            bound = (ring - 1) * cs - self.slack
+            if bound > max_dist or (len(best) >= k and bound > best[k - 1][0]):
+                break
+            if ring == 0:
+                ring_cells = [(cx, cy)]
+            elif 8 * ring > occupied:
+                # Rings are now bigger than the set of occupied cells: finish
+                # with one pass over whatever is left instead of walking empty cells
+                ring_cells = {c for layer in layers for c in layer
+                              if max(abs(c[0] - cx), abs(c[1] - cy)) >= ring}
+                last_ring = ring
+            else:
+                ring_cells = [(cx + d, cy - ring) for d in range(-ring, ring + 1)]
+                ring_cells += [(cx + d, cy + ring) for d in range(-ring, ring + 1)]
+                ring_cells += [(cx - ring, cy + d) for d in range(-ring + 1, ring)]
+                ring_cells += [(cx + ring, cy + d) for d in range(-ring + 1, ring)]
+            added = False
+            for layer in layers:
+                for c in ring_cells:
+                    bucket = layer.get(c)
+                    if not bucket:
+                        continue
+                    checked += len(bucket)
+                    for u in bucket.values():
+                        if not u.alive or (predicate is not None and not predicate(u)):
+                            continue
+                        d = math.hypot(u.x - x, u.y - y)
+                        if d <= max_dist:
+                            best.append((d, u.id, u))
+                            added = True
+            if added:
+                best.sort(key=lambda t: (t[0], t[1]))
+                del best[k:]
+            ring += 1
+        if self.profile is not None:
+            self.profile.distance_evals += checked
+        return [u for _, _, u in best]
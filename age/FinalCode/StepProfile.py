@@ -0,0 +1,90 @@
+"""
+Opt-in instrumentation for SimpleEngine.step: wall time per phase and per
+general, and counts of the hot-path operations, kept tick by tick
+"""
+import csv
+import json
+from typing import Dict, List
+
+# Phases timed by SimpleEngine._step_profiled. "units" is the whole unit pass
+# when it cannot be split (wheel scheduling, sleeping units).
+PHASES = ('generals', 'grid', 'collisions', 'combat', 'monks', 'units', 'compaction')
+COUNTERS = ('distance_evals', 'pair_checks', 'attacks', 'deaths')
+
+
+class StepProfile:
+    """Attach one to `engine.profile` to record every following step.
+
+    Counters are plain attributes so the engine and units bump them with a
+    single add; `end_tick` turns the totals into one row per tick. Only
+    engine-side work is counted: distances a general computes itself are not.
+    """
+
+    def __init__(self):
+        self.rows: List[dict] = []
+        self.battle = 0
+        self.distance_evals = 0
+        self.pair_checks = 0
+        self.attacks = 0
+        self.deaths = 0
+        self._row: dict = {}
+        self._counted = dict.fromkeys(COUNTERS, 0)
+
+    def new_battle(self):
+        """Number the rows of the next battle separately (tourneys share one profile)."""
+        self.battle += 1
+
+    def begin_tick(self, tick: float):
+        self._row = dict.fromkeys(PHASES, 0.0)
+        self._row['battle'] = self.battle
+        self._row['tick'] = tick
+
+    def add(self, phase: str, seconds: float):
+        self._row[phase] += seconds
+
+    def add_general(self, player: int, seconds: float):
+        key = f'general_{player}'
+        self._row[key] = self._row.get(key, 0.0) + seconds
+
+    def end_tick(self):
+        row = self._row
+        for name in COUNTERS:
+            total = getattr(self, name)
+            row[name] = total - self._counted[name]
+            self._counted[name] = total
+        self.rows.append(row)
+
+    # --------------------------
+    # Export
+    # --------------------------
+    def totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for row in self.rows:
+            for key, value in row.items():
+                if key not in ('battle', 'tick'):
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def to_dict(self) -> dict:
+        return {'ticks': len(self.rows), 'totals': self.totals(), 'per_tick': self.rows}
+
+    def columns(self) -> List[str]:
+        generals = sorted({k for row in self.rows for k in row if k.startswith('general_')})
+        return ['battle', 'tick'] + list(PHASES) + generals + list(COUNTERS)
+
+    def write_json(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def write_csv(self, path: str):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns(), restval=0.0)
+            writer.writeheader()
+            writer.writerows(self.rows)
+
+    def export(self, path: str):
+        """JSON for a .json path, CSV (one row per tick) otherwise."""
+        if path.lower().endswith('.json'):
+            self.write_json(path)
+        else:
+            self.write_csv(path)
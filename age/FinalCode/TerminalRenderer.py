@@ -2,12 +2,14 @@ from typing import Dict
 from dataclasses import dataclass, field
 from Map import MAP_W, MAP_H
 from Units import Unit
+from UnitTypes import TYPES
 from Generals import General
 from typing import List, Dict
 import time
 from Engine import SimpleEngine
 from GameState import GameStateManager
 from DebugInfo import DebugInfoGenerator
+from Scheduler import FixedStepScheduler
 try:
     import curses
     from curses import wrapper
@@ -29,6 +31,7 @@ class TerminalRenderer:
         self.cam_y = max(0, engine.h//2 - 10)
         self.speed_multiplier = 1.0
         self.paused = False
+        self.scheduler = FixedStepScheduler(engine)
         self.selected_idx = 0
         self.last_time = time.time()
         
@@ -42,15 +45,7 @@ class TerminalRenderer:
         self.game_over_tick = None
 
     def unit_char(self, u: Unit) -> str:
-        if u.unit_type.lower().startswith('pik'):
-            return 'P'
-        if u.unit_type.lower().startswith('cross'):
-            return 'C'
-        if u.unit_type.lower().startswith('knight'):
-            return 'K'
-        if u.unit_type.lower().startswith('monk'):
-            return 'M'
-        return '?'
+        return TYPES[u.type_code].char
 
     def draw(self, stdscr):
         try:
@@ -79,6 +74,8 @@ class TerminalRenderer:
         view_h = max(6, h-6)
 
         # draw units
+        my_units = self.engine.get_units_for_player(1)
+        selected_id = my_units[self.selected_idx].id if 0 <= self.selected_idx < len(my_units) else None
         for u in self.engine.units:
             ux = int(u.x) - int(self.cam_x)
             uy = int(u.y) - int(self.cam_y)
@@ -90,11 +87,9 @@ class TerminalRenderer:
                     attr = curses.A_DIM
                 # highlight selected
                 selected = False
-                if self.engine.get_units_for_player(1):
-                    my_units = self.engine.get_units_for_player(1)
-                    if 0 <= self.selected_idx < len(my_units) and my_units[self.selected_idx].id == u.id:
-                        attr |= curses.A_REVERSE
-                        selected = True
+                if u.id == selected_id:
+                    attr |= curses.A_REVERSE
+                    selected = True
                 try:
                     # Double-check bounds before drawing
                     y_pos = 1 + uy
@@ -181,7 +176,7 @@ class TerminalRenderer:
             my_units = self.engine.get_units_for_player(1)
             if my_units and self.selected_idx < len(my_units):
                 su = my_units[self.selected_idx]
-                enemies = [e for e in self.engine.units if e.player != 1 and e.alive]
+                enemies = self.engine.get_enemies_of(1)
                 if enemies:
                     nearest = min(enemies, key=lambda e: su.distance_to(e))
                     su.target_id = nearest.id
@@ -264,9 +259,7 @@ class TerminalRenderer:
             if inp is False:
                 break
             if not self.paused:
-                sim_dt = dt * self.speed_multiplier
-                sim_dt = min(sim_dt, 0.5)
-                self.engine.step(sim_dt, self.generals)
+                self.scheduler.advance(dt * self.speed_multiplier, self.generals)
             self.draw(stdscr)
         return 'quit'
 
@@ -275,16 +268,10 @@ class TerminalRenderer:
         if self.game_over:
             return
         
-        p1_alive = len(self.engine.get_units_for_player(1))
-        p2_alive = len(self.engine.get_units_for_player(2))
-        
-        if p1_alive == 0 and p2_alive > 0:
-            self.game_over = True
-            self.winner = 2
-            self.game_over_tick = self.engine.tick
-        elif p2_alive == 0 and p1_alive > 0:
+        # A draw (both sides wiped out) does not end the view
+        if self.engine.is_finished and self.engine.winner:
             self.game_over = True
-            self.winner = 1
+            self.winner = self.engine.winner
             self.game_over_tick = self.engine.tick
 
     def draw_game_over(self, stdscr):
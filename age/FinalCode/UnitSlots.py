@@ -0,0 +1,159 @@
+"""
+Dense table of an engine's live units, addressed by handle: a unit id packs
+the slot the unit sits in and that slot's generation
+"""
+from collections.abc import MutableMapping
+from typing import Iterator, List, Optional
+from Units import Unit
+
+SLOT_BITS = 20
+SLOT_MASK = (1 << SLOT_BITS) - 1
+# Slots, i.e. units alive at once plus ids never recycled (fresh ids are 1..MAX_SLOTS)
+MAX_SLOTS = 1 << SLOT_BITS
+
+
+def make_id(slot: int, generation: int) -> int:
+    return ((generation << SLOT_BITS) | slot) + 1
+
+
+def split_id(uid: int):
+    """(slot, generation) of a unit id."""
+    if uid < 1:
+        raise KeyError(uid)
+    v = uid - 1
+    return v & SLOT_MASK, v >> SLOT_BITS
+
+
+def fresh_id(uid: int) -> int:
+    """`uid` (an engine's next_unit_id) if it still fits in the slot space.
+
+    Past MAX_SLOTS the id would spill into the generation bits and alias a
+    live unit's slot.
+    """
+    if uid > MAX_SLOTS:
+        raise RuntimeError(f"Unit slots exhausted: no id left after {MAX_SLOTS} fresh units")
+    return uid
+
+
+class UnitSlots(MutableMapping):
+    """Mapping id -> live unit stored in a list indexed by slot.
+
+    The first unit of a slot gets generation 0, i.e. id slot + 1, so ids
+    handed out in spawn order stay 1, 2, 3... as before. `retire` (a death)
+    frees the slot and bumps its generation: the slot is reused by the
+    next `free_id`, under an id that never matches the dead unit's, so a
+    stale target id simply stops resolving and ids in events and saves
+    keep naming a single unit. `del` only takes a unit out (hand edits,
+    ghost copies) and leaves its id valid for when it comes back.
+
+    Ids only follow spawn order until a slot is recycled: a reused slot's
+    id carries its generation in the high bits, so it sorts after every
+    fresh id. Tie-breaks on the lowest id (SpatialHash.nearest and
+    query_radius, hence the collision pass, get_enemies_of) then favour
+    never-recycled units over recycled ones, whatever their spawn order.
+    They stay deterministic.
+    """
+
+    def __init__(self):
+        self.slots: List[Optional[Unit]] = []
+        self.generations: List[int] = []
+        self.free: List[int] = []
+        self._count = 0
+
+    def get(self, uid, default=None):
+        # Hot path (Unit.act, generals): one list index and an id check
+        try:
+            u = self.slots[(uid - 1) & SLOT_MASK]
+        except (IndexError, TypeError):
+            return default
+        return u if u is not None and u.id == uid else default
+
+    def __getitem__(self, uid) -> Unit:
+        u = self.get(uid)
+        if u is None:
+            raise KeyError(uid)
+        return u
+
+    def __contains__(self, uid) -> bool:
+        return self.get(uid) is not None
+
+    def __setitem__(self, uid: int, u: Unit):
+        slot, generation = split_id(uid)
+        if slot >= len(self.slots):
+            grow = slot + 1 - len(self.slots)
+            self.slots.extend([None] * grow)
+            self.generations.extend([0] * grow)
+        current = self.slots[slot]
+        if current is None:
+            self._count += 1
+        elif current.id != uid and current.alive and u.alive:
+            raise RuntimeError(f"Unit {uid} would take the slot of live unit {current.id}")
+        self.slots[slot] = u
+        # Never lower a generation: ids already handed out must not come back
+        if generation > self.generations[slot]:
+            self.generations[slot] = generation
+
+    def add_all(self, units):
+        """Store a batch of units under their own ids (bulk spawns)."""
+        units = list(units)
+        first = len(self.slots) + 1
+        if units and units[0].id == first and all(u.id == first + k for k, u in enumerate(units)):
+            fresh_id(units[-1].id)
+            # Ids fresh from next_unit_id: the slots only need appending
+            self.slots.extend(units)
+            self.generations.extend([0] * len(units))
+            self._count += len(units)
+            return
+        for u in units:
+            self[u.id] = u
+
+    def __delitem__(self, uid: int):
+        if self.get(uid) is None:
+            raise KeyError(uid)
+        self.slots[(uid - 1) & SLOT_MASK] = None
+        self._count -= 1
+
+    def __iter__(self) -> Iterator[int]:
+        return (u.id for u in self.slots if u is not None)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self):
+        self.slots.clear()
+        self.generations.clear()
+        self.free.clear()
+        self._count = 0
+
+    def retire(self, uid: int):
+        """Remove a dead unit and recycle its slot under the next generation."""
+        del self[uid]
+        slot = (uid - 1) & SLOT_MASK
+        self.generations[slot] += 1
+        self.free.append(slot)
+
+    def free_id(self) -> Optional[int]:
+        """Id for a new unit in a recycled slot, or None if none is free."""
+        while self.free:
+            slot = self.free.pop()
+            # A slot refilled by hand since it was retired is not free any more
+            if self.slots[slot] is None:
+                return make_id(slot, self.generations[slot])
+        return None
+
+    def reset(self, units):
+        """Refill with the given units only, under their current ids.
+
+        Generations survive, so an id taken before never resolves to another
+        unit afterwards. Slots left empty are freed under the next generation
+        (retired ones already are).
+        """
+        retired = set(self.free)
+        self.slots = [None] * len(self.slots)
+        self._count = 0
+        for u in units:
+            self[u.id] = u
+        for slot, u in enumerate(self.slots):
+            if u is None and slot not in retired:
+                self.generations[slot] += 1
+                self.free.append(slot)
@@ -0,0 +1,129 @@
+"""
+Unit type registry: one shared stat block per unit type, addressed by an
+integer code. Units only store their code; tags, bonuses, colours, map
+character and sprite name are looked up here, as well as the precomputed
+attacker-vs-defender bonus and damage tables.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+Color = Tuple[int, int, int]
+
+
+@dataclass(eq=False)
+class UnitType:
+    name: str
+    char: str = '?'
+    hp: float = 55
+    attack: float = 50.0
+    armor: float = 0.0
+    range: float = 1.0
+    speed: float = 1.0
+    reload_time: float = 1.0
+    regen: float = 0.0
+    tags: Tuple[str, ...] = ()
+    bonuses: Dict[str, float] = field(default_factory=dict)
+    healer: bool = False
+    color: Color = (255, 255, 255)
+    player_colors: Dict[int, Color] = field(default_factory=dict)
+    code: int = -1
+
+    def stats(self) -> Dict[str, float]:
+        """Per-unit stat defaults handed to the Unit constructor."""
+        return {"hp": self.hp, "attack": self.attack, "armor": self.armor, "range": self.range,
+                "speed": self.speed, "reload_time": self.reload_time, "regen": self.regen}
+
+    def color_for(self, player: int) -> Color:
+        return self.player_colors.get(player, self.color)
+
+
+TYPES: List[UnitType] = []
+_BY_KEY: Dict[str, UnitType] = {}
+
+# Bumped whenever a type is added or its stats change; tables are rebuilt lazily
+version = 0
+_tables: Optional[Tuple[int, List[List[float]], List[List[float]]]] = None
+
+
+def register(utype: UnitType, *aliases: str) -> int:
+    global version
+    utype.code = len(TYPES)
+    TYPES.append(utype)
+    for key in (utype.name,) + aliases:
+        _BY_KEY[key.lower()] = utype
+    version += 1
+    return utype.code
+
+
+def set_stats(unit_type: Union[str, int], **stats):
+    """Change a type's stat block (upgrades, balancing) and invalidate the tables.
+
+    Units already on the map keep their own stats.
+    """
+    global version
+    utype = get_type(unit_type)
+    for name, value in stats.items():
+        if not hasattr(utype, name) or name in ("name", "code"):
+            raise AttributeError(f"Unknown unit type stat: {name}")
+        setattr(utype, name, value)
+    version += 1
+
+
+def tables() -> Tuple[List[List[float]], List[List[float]]]:
+    """(bonus, damage) tables indexed [attacker code][defender code].
+
+    bonus is the attacker's bonus summed over the defender's tags; damage is
+    the AOE2 hit, max(1, attack + bonus - armor), from the types' own stats.
+    """
+    global _tables
+    if _tables is None or _tables[0] != version:
+        bonus = [[sum(a.bonuses.get(tag, 0.0) for tag in d.tags) for d in TYPES] for a in TYPES]
+        damage = [[max(1.0, a.attack + bonus[a.code][d.code] - d.armor) for d in TYPES] for a in TYPES]
+        _tables = (version, bonus, damage)
+    return _tables[1], _tables[2]
+
+
+def get_type(unit_type: Union[str, int]) -> UnitType:
+    """Registry entry for a code or a type name (case-insensitive).
+
+    Unknown names are registered on the fly with the generic Unit defaults.
+    """
+    if isinstance(unit_type, int):
+        return TYPES[unit_type]
+    utype = _BY_KEY.get(unit_type.lower())
+    if utype is None:
+        utype = UnitType(name=unit_type)
+        register(utype)
+    return utype
+
+
+def type_code(unit_type: Union[str, int]) -> int:
+    return get_type(unit_type).code
+
+
+def canonical_name(unit_type: Optional[str]) -> Optional[str]:
+    return None if unit_type is None else get_type(unit_type).name
+
+
+PIKEMAN = register(UnitType(
+    name="Pikeman", char='P', hp=55, attack=4, reload_time=3.0, range=1.0, speed=1.0,
+    tags=("infantry",), bonuses={"Cavalry": 22.0}, color=(200, 50, 50),
+    player_colors={1: (255, 100, 50), 2: (50, 150, 255)},
+), "pike")
+CROSSBOWMAN = register(UnitType(
+    name="Crossbowman", char='C', hp=35, attack=5, reload_time=2.0, range=5.0, speed=0.96,
+    tags=("archer",), color=(255, 200, 50),
+    player_colors={1: (255, 50, 50), 2: (100, 200, 255)},
+), "crossbow")
+KNIGHT = register(UnitType(
+    name="Knight", char='K', hp=100, attack=10, reload_time=1.8, armor=2, range=1.0, speed=1.35,
+    tags=("Cavalry",), color=(180, 180, 180),
+    player_colors={1: (200, 0, 0), 2: (0, 100, 255)},
+))
+MONK = register(UnitType(
+    name="Monk", char='M', hp=30, attack=0.0, reload_time=1.0, range=9.0, speed=0.7, regen=2.5,
+    tags=("Monk",), healer=True, color=(50, 200, 120),
+    player_colors={1: (255, 150, 100), 2: (150, 200, 255)},
+))
+# Referenced by the generals' scoring tables; no scenario spawns it yet
+MAGE = register(UnitType(name="Mage", color=(120, 50, 200)))
@@ -1,8 +1,9 @@
 from dataclasses import dataclass, field
-from typing import List, Tuple, Optional, Dict
+from typing import Tuple, Optional, Dict
 import math
+from UnitTypes import TYPES, MONK, get_type, tables
 
-@dataclass
+@dataclass(slots=True)
 class Unit:
     id: int
     player: int
@@ -20,33 +21,72 @@ class Unit:
     reload_time: float = 1.0
     reload_timer: float = 0.0
     unit_type: str = "Pikeman"
-    color: Optional[Tuple[int,int,int]] = None
-    tags: List[str] = field(default_factory=list)
-    bonuses: Dict[str, float] = field(default_factory=dict)
     
     # Paramètre de collision (Rayon de l'unité)
     radius: float = 0.4 
 
+    # Dernière position dessinée (orientation des sprites)
+    last_x: Optional[float] = None
+    last_y: Optional[float] = None
+
+    # Code du type dans UnitTypes : tags, bonus et couleurs y sont partagés
+    type_code: int = field(init=False, default=0)
+
     def __post_init__(self):
-        type_colors = {
-            "Pikeman": (200, 50, 50),
-            "Crossbowman": (255, 200, 50),
-            "knight": (180, 180, 180),
-            "mage": (120, 50, 200),
-            "Monk": (50, 200, 120)
-        }
-        if self.color is None:
-            self.color = type_colors.get(self.unit_type, (255, 255, 255))
+        utype = get_type(self.unit_type)
+        self.unit_type = utype.name
+        self.type_code = utype.code
 
         if self.max_hp is None:
             self.max_hp = self.hp
 
+    @property
+    def tags(self) -> Tuple[str, ...]:
+        return TYPES[self.type_code].tags
+
+    @property
+    def bonuses(self) -> Dict[str, float]:
+        return TYPES[self.type_code].bonuses
+
+    @property
+    def color(self) -> Tuple[int, int, int]:
+        return TYPES[self.type_code].color_for(self.player)
+
+    def damage_against(self, target: "Unit") -> float:
+        """Dégâts d'un coup sur `target` : FORMULE AOE2, Max(1, Somme des dégâts - Armure).
+
+        Lu dans la table des types tant que l'attaque et l'armure des deux
+        unités sont celles de leur type, recalculé sinon.
+        """
+        bonus, damage = tables()
+        a, d = self.type_code, target.type_code
+        if self.attack == TYPES[a].attack and target.armor == TYPES[d].armor:
+            return damage[a][d]
+        return max(1.0, self.attack + bonus[a][d] - target.armor)
+
     def distance_to(self, other: "Unit") -> float:
         return math.hypot(self.x - other.x, self.y - other.y)
 
     def handle_collisions(self, engine: "SimpleEngine"):
         """Empêche les unités de se chevaucher (Algorithme de séparation)."""
-        for other in engine.units:
+        # Voisins pris dans la grille avec une marge : self se déplace pendant la boucle
+        margin = engine.grid.slack
+        start_x, start_y = self.x, self.y
+        reach = self.radius + engine.grid.max_radius + margin
+        neighbours = engine.grid.query_radius(self.x, self.y, reach)
+        prof = engine.profile
+        if prof is not None:
+            prof.pair_checks += len(neighbours)
+        if not self._separate_from(neighbours, start_x, start_y, margin):
+            # Poussée plus grande que la marge : on rejoue sur toutes les unités
+            self.x, self.y = start_x, start_y
+            self._separate_from(engine.units)
+            if prof is not None:
+                prof.pair_checks += len(engine.units)
+
+    def _separate_from(self, others, start_x: float = 0.0, start_y: float = 0.0,
+                       margin: Optional[float] = None) -> bool:
+        for other in others:
             if other.id == self.id or not other.alive:
                 continue
             
@@ -60,14 +100,21 @@ class Unit:
                 # On repousse l'unité de la moitié de l'interpénétration
                 self.x += (dx / dist) * overlap * 0.5
                 self.y += (dy / dist) * overlap * 0.5
+                if margin is not None and math.hypot(self.x - start_x, self.y - start_y) > margin:
+                    return False
+        return True
 
     def step(self, dt: float, engine: "SimpleEngine"):
         if not self.alive:
             return
 
-        # 1. Gestion des collisions
-        self.handle_collisions(engine)
+        # 1. Gestion des collisions (sinon faite en un seul passage par le moteur)
+        if engine.collisions == "per_unit":
+            self.handle_collisions(engine)
+        self.act(dt, engine)
 
+    def act(self, dt: float, engine: "SimpleEngine"):
+        """Tout le pas de l'unité sauf les collisions."""
         # 2. Gestion du rechargement et régénération
         if self.reload_timer > 0:
             self.reload_timer -= dt
@@ -76,11 +123,12 @@ class Unit:
             self.hp = min(self.hp + self.regen * dt, self.max_hp)
 
         # 3. Logique spécifique au Moine (Heal)
-        if self.unit_type == "Monk":
-            allies = [a for a in engine.units if a.player == self.player and a.alive and a.hp < a.max_hp]
-            if allies:
-                target = min(allies, key=lambda a: self.distance_to(a))
+        if self.type_code == MONK:
+            target = engine.nearest_wounded(self.x, self.y, self.player)
+            if target is not None:
                 dist = self.distance_to(target)
+                if engine.profile is not None:
+                    engine.profile.distance_evals += 1
                 if dist <= self.range:
                     if self.reload_timer <= 0:
                         target.hp = min(target.hp + self.regen, target.max_hp)
@@ -97,22 +145,27 @@ class Unit:
             return
 
         d = self.distance_to(target)
+        prof = engine.profile
+        if prof is not None:
+            prof.distance_evals += 1
         if d <= self.range + 0.2: # Marge pour les unités au corps à corps
             if self.reload_timer <= 0:
-                # FORMULE AOE2 : Max(1, Somme des dégâts - Armure)
-                total_attack = self.attack
-                for tag in target.tags:
-                    total_attack += self.bonuses.get(tag, 0.0)
-                
-                damage = max(1.0, total_attack - target.armor)
-                
-                target.hp -= damage
+                if prof is not None:
+                    prof.attacks += 1
+                if engine.combat == "two_phase":
+                    # Appliqué en fin de tick par l'engine, avec tous les autres coups
+                    engine.hits.append((self, target, self.damage_against(target)))
+                    self.reload_timer = self.reload_time
+                    return
+                target.hp -= self.damage_against(target)
                 self.reload_timer = self.reload_time
                 
                 if target.hp <= 0:
                     target.alive = False
                     target.hp = 0
-                    engine.mark_dead(target)
+                    engine.mark_dead(target, self)
+                else:
+                    engine.note_damage(target)
         else:
             self.move_towards(target, dt)
 
@@ -0,0 +1,413 @@
+"""
+Structure-of-arrays engine backend: unit state lives in NumPy columns and
+`step` moves, reloads, regenerates and resolves damage for every unit at once.
+"""
+from typing import Dict, List, Optional, Tuple, Union
+from Map import MAP_W, MAP_H
+from Units import Unit
+from Generals import General
+from SpatialHash import SpatialHash
+from Separation import separation_displacements
+from EventLog import EventLog, EVENT_DEATH
+from UnitSlots import UnitSlots, fresh_id
+from Perception import Perception
+import UnitTypes
+from UnitTypes import TYPES, get_type
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Per-unit float64 columns, mirrored one-to-one by UnitView properties
+FLOAT_COLUMNS = ('x', 'y', 'hp', 'max_hp', 'attack', 'armor', 'range', 'speed',
+                 'regen', 'reload_time', 'reload_timer', 'radius')
+
+
+def _column(name: str, cast):
+    def fget(self):
+        return cast(getattr(self._engine, name)[self._i])
+
+    def fset(self, value):
+        getattr(self._engine, name)[self._i] = value
+    return property(fget, fset)
+
+
+class UnitView:
+    """Unit-compatible handle onto one row of a VectorEngine.
+
+    Generals, renderers and the save manager read and write it exactly like a
+    `Unit`; every attribute goes straight to the engine's arrays.
+    """
+
+    def __init__(self, engine: "VectorEngine", index: int):
+        self._engine = engine
+        self._i = index
+
+    x = _column('x', float)
+    y = _column('y', float)
+    hp = _column('hp', float)
+    max_hp = _column('max_hp', float)
+    attack = _column('attack', float)
+    armor = _column('armor', float)
+    range = _column('range', float)
+    speed = _column('speed', float)
+    regen = _column('regen', float)
+    reload_time = _column('reload_time', float)
+    reload_timer = _column('reload_timer', float)
+    radius = _column('radius', float)
+    alive = _column('alive', bool)
+
+    @property
+    def id(self) -> int:
+        return int(self._engine.ids[self._i])
+
+    @property
+    def player(self) -> int:
+        return int(self._engine.player[self._i])
+
+    @property
+    def type_code(self) -> int:
+        return int(self._engine.type_code[self._i])
+
+    @property
+    def unit_type(self) -> str:
+        return TYPES[self.type_code].name
+
+    @property
+    def tags(self) -> Tuple[str, ...]:
+        return TYPES[self.type_code].tags
+
+    @property
+    def bonuses(self) -> Dict[str, float]:
+        return TYPES[self.type_code].bonuses
+
+    @property
+    def color(self):
+        return TYPES[self.type_code].color_for(self.player)
+
+    @property
+    def target_id(self) -> Optional[int]:
+        t = self._engine.target[self._i]
+        return int(self._engine.ids[t]) if t >= 0 else None
+
+    @target_id.setter
+    def target_id(self, value: Optional[int]):
+        self._engine.target[self._i] = -1 if value is None else self._engine.index_of.get(value, -1)
+
+    # Sprite orientation, kept by the renderer per view
+    last_x: Optional[float] = None
+    last_y: Optional[float] = None
+
+    distance_to = Unit.distance_to
+    move_towards = Unit.move_towards
+
+
+class VectorEngine:
+    """Drop-in replacement for SimpleEngine for large headless battles.
+
+    Units never leave the arrays; dead rows are masked out by `alive`.
+    Combat is resolved simultaneously: every attacker whose reload is ready
+    hits in the same pass, so unlike SimpleEngine a unit killed this tick
+    still lands its own blow. Collisions always use the batched separation
+    pass from Separation.py.
+
+    Only worth it for large unit counts (thousands): every attribute a
+    general or renderer reads goes through a UnitView property, so with a
+    few hundred units and NG/Genghis generals it is slower than SimpleEngine.
+    """
+
+    def __init__(self, w: int = MAP_W, h: int = MAP_H, capacity: int = 256):
+        if np is None:
+            raise RuntimeError("NumPy not installed.")
+        self.w = w
+        self.h = h
+        self.next_unit_id = 1
+        self.tick = 0.0
+        self.events = EventLog()
+        self.count = 0
+        self.alive_counts: Dict[int, int] = {}
+
+        for name in FLOAT_COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=np.float64))
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.player = np.zeros(capacity, dtype=np.int64)
+        self.type_code = np.zeros(capacity, dtype=np.int64)
+        self.target = np.full(capacity, -1, dtype=np.int64)
+        self.index_of: Dict[int, int] = {}
+
+        # Per-type tables indexed by UnitTypes code, rebuilt when the registry changes
+        self.types_version = -1
+        self.type_healer = np.zeros(0, dtype=bool)
+        self.bonus_table = np.zeros((0, 0), dtype=np.float64)
+
+        self._views: List[UnitView] = []
+        self.units: List[UnitView] = []
+        self.units_by_id = UnitSlots()
+        self._grid = SpatialHash()
+        self._grid_dirty = False
+        self._perception: Optional[Perception] = None
+
+    # --------------------------
+    # SimpleEngine interface
+    # --------------------------
+    @property
+    def grid(self) -> SpatialHash:
+        if self._grid_dirty:
+            self._grid.refresh(self.units)
+            self._grid_dirty = False
+        return self._grid
+
+    def spawn_unit(self, player: int, x: float, y: float, **kwargs) -> UnitView:
+        stats = get_type(kwargs.get('unit_type', "Pikeman")).stats()
+        stats.update(kwargs)
+        uid = self.units_by_id.free_id()
+        if uid is None:
+            uid = fresh_id(self.next_unit_id)
+            self.next_unit_id += 1
+        u = Unit(id=uid, player=player, x=x, y=y, **stats)
+        # Ensure hp default if not passed
+        if u.hp == 0.0:
+            u.hp = kwargs.get('hp', 55)
+        view = self._append(u)
+        self.units.append(view)
+        self.units_by_id[u.id] = view
+        self._perception = None
+        self._grid.insert(view)
+        self.alive_counts[player] = self.alive_counts.get(player, 0) + 1
+        return view
+
+    def spawn_units(self, player: int, xs, ys, unit_type: str = "Pikeman", **kwargs) -> List[UnitView]:
+        """Spawn one unit of `unit_type` at each (xs[i], ys[i]): same ids and
+        rows as that many spawn_unit calls, each column filled with one slice."""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        m = len(xs)
+        if m == 0:
+            return []
+        stats = get_type(unit_type).stats()
+        stats.update(kwargs)
+        stats['unit_type'] = unit_type
+        # Every unit of the batch starts as this one, but for its position
+        proto = Unit(id=0, player=player, x=0.0, y=0.0, **stats)
+        if proto.hp == 0.0:
+            proto.hp = kwargs.get('hp', 55)
+
+        by_id = self.units_by_id
+        ids = []
+        while by_id.free and len(ids) < m:
+            uid = by_id.free_id()
+            if uid is None:
+                break
+            ids.append(uid)
+        rest = m - len(ids)
+        if rest:
+            fresh_id(self.next_unit_id + rest - 1)
+            ids.extend(range(self.next_unit_id, self.next_unit_id + rest))
+            self.next_unit_id += rest
+
+        i, j = self.count, self.count + m
+        if j > len(self.x):
+            self._grow(max(j, 2 * len(self.x)))
+        for name in FLOAT_COLUMNS:
+            getattr(self, name)[i:j] = getattr(proto, name)
+        self.x[i:j] = xs
+        self.y[i:j] = ys
+        self.alive[i:j] = proto.alive
+        self.ids[i:j] = ids
+        self.player[i:j] = player
+        self.type_code[i:j] = proto.type_code
+        self.target[i:j] = self.index_of.get(proto.target_id, -1)
+        self.index_of.update(zip(ids, range(i, j)))
+        views = [UnitView(self, k) for k in range(i, j)]
+        self._views.extend(views)
+        self.count = j
+
+        self.units.extend(views)
+        by_id.add_all(views)
+        self._perception = None
+        self._grid.insert_many(views)
+        self.alive_counts[player] = self.alive_counts.get(player, 0) + m
+        return views
+
+    def mark_dead(self, unit: UnitView, killer: Optional[UnitView] = None):
+        self._grid.remove(unit)
+        self.units_by_id.retire(unit.id)
+        self._perception = None
+        self.alive_counts[unit.player] -= 1
+        self.events.append(self.tick, EVENT_DEATH, unit.id, unit.player, killer.id if killer else None)
+
+    def get_units_for_player(self, player: int, unit_type: Union[str, int, None] = None) -> List[UnitView]:
+        n = self.count
+        return self._select(self.alive[:n] & (self.player[:n] == player), unit_type)
+
+    def get_enemies_of(self, player: int, unit_type: Union[str, int, None] = None) -> List[UnitView]:
+        n = self.count
+        return self._select(self.alive[:n] & (self.player[:n] != player), unit_type)
+
+    def alive_count(self, player: int) -> int:
+        return self.alive_counts.get(player, 0)
+
+    def close(self):
+        self.events.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def perception(self) -> Perception:
+        p = self._perception
+        if p is None or p.tick != self.tick:
+            p = self._perception = Perception(self)
+        return p
+
+    @property
+    def winner(self) -> Optional[int]:
+        left = [p for p, n in self.alive_counts.items() if n > 0]
+        if len(left) > 1:
+            return None
+        return left[0] if left else 0
+
+    @property
+    def is_finished(self) -> bool:
+        return self.winner is not None
+
+    def wounded_allies(self, player: int) -> List[UnitView]:
+        return [self._views[i] for i in self._wounded(player)]
+
+    def nearest_wounded(self, x: float, y: float, player: int) -> Optional[UnitView]:
+        wounded = self._wounded(player)
+        if wounded.size == 0:
+            return None
+        return self._views[wounded[np.argmin(np.hypot(self.x[wounded] - x, self.y[wounded] - y))]]
+
+    def step(self, dt: float, generals: Dict[int, "General"]):
+        self.tick += dt
+        for pid, gen in generals.items():
+            gen.give_orders(self)
+
+        if self.types_version != UnitTypes.version:
+            self._sync_types()
+
+        n = self.count
+        x, y, hp = self.x[:n], self.y[:n], self.hp[:n]
+        reload_timer = self.reload_timer[:n]
+        live = self.alive[:n].copy()
+
+        # Collisions : un seul passage vectorisé
+        idx = np.flatnonzero(live)
+        disp_x, disp_y = separation_displacements(x[idx], y[idx], self.radius[idx])
+        x[idx] += disp_x
+        y[idx] += disp_y
+
+        # Rechargement et régénération
+        reload_timer[live & (reload_timer > 0)] -= dt
+        regen = self.regen[:n]
+        healing = live & (regen > 0)
+        hp[healing] = np.minimum(hp[healing] + regen[healing] * dt, self.max_hp[:n][healing])
+
+        healer = self.type_healer[self.type_code[:n]]
+        for i in np.flatnonzero(live & healer):
+            self._monk_step(i, dt)
+
+        # Combat : cibles encore valides
+        fighters = np.flatnonzero(live & ~healer)
+        tgt = self.target[fighters]
+        valid = tgt >= 0
+        valid[valid] = self.alive[tgt[valid]]
+        self.target[fighters[~valid]] = -1
+        f, t = fighters[valid], tgt[valid]
+
+        dx = x[t] - x[f]
+        dy = y[t] - y[f]
+        d = np.hypot(dx, dy)
+        in_range = d <= self.range[f] + 0.2
+
+        fire = in_range & (reload_timer[f] <= 0)
+        a, ta = f[fire], t[fire]
+        damage = np.maximum(1.0, self.attack[a] + self.bonus_table[self.type_code[a], self.type_code[ta]] - self.armor[ta])
+        np.subtract.at(hp, ta, damage)
+        reload_timer[a] = self.reload_time[a]
+
+        move = ~in_range & (d > 1e-6)
+        m = f[move]
+        scale = self.speed[m] * dt / d[move]
+        x[m] += dx[move] * scale
+        y[m] += dy[move] * scale
+
+        dead = np.flatnonzero(live & (hp <= 0))
+        if dead.size:
+            self.alive[dead] = False
+            hp[dead] = 0
+            # Killer = highest-index attacker that hit the unit this tick
+            killer = np.full(n, -1, dtype=np.int64)
+            np.maximum.at(killer, ta, a)
+            for i in dead:
+                k = killer[i]
+                self.mark_dead(self._views[i], self._views[k] if k >= 0 else None)
+            self.units = [v for v in self.units if self.alive[v._i]]
+        self._grid_dirty = True
+
+    # --------------------------
+    # Internals
+    # --------------------------
+    def _select(self, mask, unit_type: Union[str, int, None]) -> List[UnitView]:
+        if unit_type is not None:
+            mask = mask & (self.type_code[:self.count] == get_type(unit_type).code)
+        return [self._views[i] for i in np.flatnonzero(mask)]
+
+    def _wounded(self, player: int):
+        n = self.count
+        return np.flatnonzero(self.alive[:n] & (self.player[:n] == player) & (self.hp[:n] < self.max_hp[:n]))
+
+    def _monk_step(self, i: int, dt: float):
+        n = self.count
+        hp, max_hp = self.hp[:n], self.max_hp[:n]
+        wounded = self._wounded(self.player[i])
+        if wounded.size == 0:
+            return
+        d = np.hypot(self.x[wounded] - self.x[i], self.y[wounded] - self.y[i])
+        j = int(np.argmin(d))
+        target = wounded[j]
+        if d[j] <= self.range[i]:
+            if self.reload_timer[i] <= 0:
+                hp[target] = min(hp[target] + self.regen[i], max_hp[target])
+                self.reload_timer[i] = self.reload_time[i]
+        else:
+            self._views[i].move_towards(self._views[target], dt)
+
+    def _append(self, u: Unit) -> UnitView:
+        i = self.count
+        if i == len(self.x):
+            self._grow(max(1, 2 * i))
+        for name in FLOAT_COLUMNS:
+            getattr(self, name)[i] = getattr(u, name)
+        self.alive[i] = u.alive
+        self.ids[i] = u.id
+        self.player[i] = u.player
+        self.type_code[i] = u.type_code
+        self.target[i] = self.index_of.get(u.target_id, -1)
+        self.index_of[u.id] = i
+        view = UnitView(self, i)
+        self._views.append(view)
+        self.count += 1
+        return view
+
+    def _grow(self, capacity: int):
+        for name in FLOAT_COLUMNS + ('alive', 'ids', 'player', 'type_code', 'target'):
+            old = getattr(self, name)
+            fill = -1 if name == 'target' else 0
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _sync_types(self):
+        k = len(TYPES)
+        bonus, _ = UnitTypes.tables()
+        self.type_healer = np.array([t.healer for t in TYPES], dtype=bool)
+        # bonus_table[attaquant, défenseur] = somme des bonus contre les tags du défenseur
+        self.bonus_table = np.array(bonus, dtype=np.float64).reshape(k, k)
+        self.types_version = UnitTypes.version
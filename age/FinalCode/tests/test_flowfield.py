@@ -0,0 +1,66 @@
+import math
+import random
+
+import pytest
+
+import Generals
+from Engine import SimpleEngine
+from FlowField import ThreatField
+from Generals import DaftGeneral, GenghisKhanPrimeGeneral, New_General_2
+from Scenario import chevron_scenario, echelon_scenario, optimal_scenario
+
+
+class _ScanField:
+    """ThreatField's answers from a min() over every threat, as the generals
+    computed them per unit before the fields were shared."""
+
+    found = 0
+
+    def __init__(self, threats, radius):
+        self.threats = list(threats)
+        self.radius = radius
+
+    def nearest(self, x, y):
+        best = min(self.threats, key=lambda t: math.hypot(x - t.x, y - t.y), default=None)
+        if best is None or math.hypot(x - best.x, y - best.y) > self.radius:
+            return None
+        _ScanField.found += 1
+        return best
+
+
+def _battle(scenario, generals, max_steps: int = 900):
+    random.seed(1)
+    engine = SimpleEngine()
+    scenario(engine)
+    steps = 0
+    while steps < max_steps and not engine.is_finished:
+        engine.step(0.2, generals)
+        steps += 1
+    return steps, engine.winner, [(u.id, u.x, u.y, u.hp, u.target_id) for u in engine.units]
+
+
+@pytest.mark.parametrize("scenario, enemy", [
+    (chevron_scenario, DaftGeneral),
+    (echelon_scenario, DaftGeneral),
+    (optimal_scenario, New_General_2),
+])
+def test_genghis_runs_match_a_full_scan_of_threats(monkeypatch, scenario, enemy):
+    shared = _battle(scenario, {1: GenghisKhanPrimeGeneral(1), 2: enemy(2)})
+    monkeypatch.setattr(Generals, "ThreatField", _ScanField)
+    _ScanField.found = 0
+    scanned = _battle(scenario, {1: GenghisKhanPrimeGeneral(1), 2: enemy(2)})
+    assert _ScanField.found > 0
+    assert shared == scanned
+
+
+def test_threat_field_nearest_matches_a_full_scan():
+    rng = random.Random(3)
+    engine = SimpleEngine()
+    # Whole-number positions give ties, which go to the threat listed first
+    threats = [engine.spawn_unit(2, float(rng.randrange(0, 60)), float(rng.randrange(0, 60)))
+               for _ in range(200)]
+    for radius in (2.5, 3.5, 8.0):
+        field, scan = ThreatField(threats, radius), _ScanField(threats, radius)
+        for _ in range(500):
+            x, y = rng.uniform(-5, 65), rng.uniform(-5, 65)
+            assert field.nearest(x, y) is scan.nearest(x, y)
@@ -0,0 +1,48 @@
+import math
+import random
+
+import pytest
+
+from Engine import SimpleEngine
+from Generals import DaftGeneral, nearest_enemies
+from Scenario import chevron_scenario, echelon_scenario, optimal_scenario, square_scenario
+
+pytest.importorskip("numpy")
+
+
+def _grid_picks(engine, player, max_dist):
+    units = [u for u in engine.units if u.alive and u.player == player]
+    picks = [engine.grid.nearest(u.x, u.y, max_dist=max_dist, enemy_of=player) for u in units]
+    return units, [found[0].id if found else None for found in picks]
+
+
+def _assert_same_picks(engine):
+    # Generals read it before the unit pass; units have moved since
+    engine._perception = None
+    for player in (1, 2):
+        for max_dist in (0.5, 5.0, 12.0, math.inf):
+            units, expected = _grid_picks(engine, player, max_dist)
+            picks = nearest_enemies(units, player, engine, max_dist)
+            assert [v.id if v is not None else None for v in picks] == expected
+
+
+@pytest.mark.parametrize("scenario", [square_scenario, chevron_scenario, optimal_scenario, echelon_scenario])
+def test_nearest_enemies_matches_grid_on_bundled_scenarios(scenario):
+    random.seed(1)
+    engine = SimpleEngine()
+    scenario(engine)
+    _assert_same_picks(engine)
+    # Mid-fight, with dead units and lines in contact
+    generals = {1: DaftGeneral(1), 2: DaftGeneral(2)}
+    for _ in range(150):
+        engine.step(0.2, generals)
+    _assert_same_picks(engine)
+
+
+def test_nearest_enemies_matches_grid_on_ties():
+    # Whole-number positions: many enemies at exactly the same distance
+    rng = random.Random(7)
+    engine = SimpleEngine()
+    for k in range(300):
+        engine.spawn_unit(1 + k % 2, float(rng.randrange(20, 100)), float(rng.randrange(20, 100)))
+    _assert_same_picks(engine)
@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from Engine import SimpleEngine
+from Generals import BrainDeadGeneral, DaftGeneral
+from Scenario import chevron_scenario, echelon_scenario, optimal_scenario, square_scenario
+
+
+def _battle(scenario, generals, max_steps: int = 900, **kw):
+    """Run a bundled scenario to the end; returns (steps, winner, survivors, state)."""
+    random.seed(1)
+    engine = SimpleEngine(**kw)
+    scenario(engine)
+    steps = 0
+    while steps < max_steps and not engine.is_finished:
+        engine.step(0.2, generals)
+        steps += 1
+    state = [(u.id, u.x, u.y, u.hp) for u in engine.units]
+    return steps, engine.winner, (engine.alive_count(1), engine.alive_count(2)), state
+
+
+@pytest.mark.parametrize("scenario", [square_scenario, chevron_scenario, optimal_scenario, echelon_scenario])
+def test_lod_matches_full_rate_on_bundled_scenarios(scenario):
+    # BrainDead's army stands idle in formation until Daft's reaches it
+    full = _battle(scenario, {1: DaftGeneral(1), 2: BrainDeadGeneral(2)})
+    lod = _battle(scenario, {1: DaftGeneral(1), 2: BrainDeadGeneral(2)}, lod_every=3)
+    assert lod == full
+
+
+def test_lod_leaves_a_fight_with_targets_unchanged():
+    # Daft hands everyone a target on the first tick: nobody is quiet
+    full = _battle(square_scenario, {1: DaftGeneral(1), 2: DaftGeneral(2)})
+    lod = _battle(square_scenario, {1: DaftGeneral(1), 2: DaftGeneral(2)}, lod_every=3)
+    assert lod == full
@@ -0,0 +1,33 @@
+from Engine import SimpleEngine
+from PartitionedEngine import PartitionedEngine
+from Generals import DaftGeneral
+
+
+def _border_fight(engine, steps: int = 300):
+    """Three knights against two, face to face across the middle of the map
+    (the border of a two-strip PartitionedEngine). Returns (step, dead ids)."""
+    m = engine.w / 2
+    for k in range(3):
+        engine.spawn_unit(1, m - 0.45, 20.0 + k, unit_type="Knight")
+    for k in range(2):
+        engine.spawn_unit(2, m + 0.45, 20.0 + k, unit_type="Knight")
+    generals = {1: DaftGeneral(1), 2: DaftGeneral(2)}
+    for i in range(steps):
+        engine.step(0.2, generals)
+        if engine.is_finished:
+            break
+    return i, sorted(e.unit_id for e in engine.events)
+
+
+def test_hits_across_a_strip_border_kill():
+    simple_step, simple_dead = _border_fight(SimpleEngine())
+    engine = PartitionedEngine(workers=2)
+    try:
+        step, dead = _border_fight(engine)
+        assert engine.strips == 2
+        assert engine.winner == 1
+    finally:
+        engine.close()
+    # Border hits land at the end of the tick: same victims, no earlier than alone
+    assert dead == simple_dead
+    assert simple_step <= step <= simple_step + 1
@@ -0,0 +1,52 @@
+import random
+
+from Engine import SimpleEngine
+from Generals import BrainDeadGeneral, DaftGeneral
+from Scenario import square_scenario
+
+
+def _battle(engine, generals, warp: bool, max_steps: int = 900):
+    """Run to the end; returns (steps, ticks warped, winner, survivors, state)."""
+    steps = warped = 0
+    while steps < max_steps and not engine.is_finished:
+        n = engine.warp(0.2, generals, max_steps - steps) if warp else 0
+        if n:
+            steps += n
+            warped += n
+        else:
+            engine.step(0.2, generals)
+            steps += 1
+    state = [(u.id, u.x, u.y, u.hp, u.reload_timer) for u in engine.units]
+    return steps, warped, engine.winner, (engine.alive_count(1), engine.alive_count(2)), state
+
+
+def _lines(engine):
+    # Ten knights a side, 3.0 apart, 50 apart: BrainDead only reacts within 5
+    for k in range(10):
+        engine.spawn_unit(1, 30.0, 10.0 + 3.0 * k, unit_type="Knight")
+        engine.spawn_unit(2, 80.0, 10.0 + 3.0 * k, unit_type="Knight")
+
+
+def test_warp_stops_before_braindead_engages():
+    plain = _battle(_make(_lines), {1: DaftGeneral(1), 2: BrainDeadGeneral(2)}, warp=False)
+    warped = _battle(_make(_lines), {1: DaftGeneral(1), 2: BrainDeadGeneral(2)}, warp=True)
+    assert warped[1] > 100
+    assert warped[0] == plain[0]
+    assert warped[2:] == plain[2:]
+
+
+def test_warp_is_exact_on_a_packed_formation():
+    def square(engine):
+        random.seed(1)
+        square_scenario(engine)
+    plain = _battle(_make(square), {1: DaftGeneral(1), 2: DaftGeneral(2)}, warp=False)
+    warped = _battle(_make(square), {1: DaftGeneral(1), 2: DaftGeneral(2)}, warp=True)
+    assert warped[1] > 10
+    assert warped[0] == plain[0]
+    assert warped[2:] == plain[2:]
+
+
+def _make(scenario):
+    engine = SimpleEngine()
+    scenario(engine)
+    return engine
@@ -3,9 +3,9 @@
 Battle CLI - Simple entry point
 Usage:
     battle run <scenario> [-d DATAFILE] [--seed SEED]
-    battle run <scenario> <AI1> <AI2> [-t] [-d DATAFILE] [--seed SEED]
+    battle run <scenario> <AI1> <AI2> [-t] [-d DATAFILE] [--seed SEED] [--engine simple|vector|partitioned] [--collisions per_unit|batched] [--scheduling per_tick|wheel] [--sleep-idle] [--lod K] [--combat immediate|two_phase] [--workers N] [--chunk-size SIZE] [--map-size W H]
     battle load <savefile>
-    battle tourney [-G AI1 AI2...] [-S SCENARIO...] [-N ROUNDS] [-na] [-d DATAFILE]
+    battle tourney [-G AI1 AI2...] [-S SCENARIO...] [-N ROUNDS] [-na] [-d DATAFILE] [--engine simple|vector|partitioned] [--collisions per_unit|batched] [--scheduling per_tick|wheel] [--sleep-idle] [--lod K] [--combat immediate|two_phase] [--workers N] [--chunk-size SIZE] [--map-size W H] [--warp] [--profile FILE]
     battle plot <AI> <plotter> <scenario> <units...> range (values) [-N ROUNDS]
 """
 
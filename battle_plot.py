@@ -11,9 +11,9 @@ def run_simulation(unit_type, N):
     max_ticks = 300.0
     while engine.tick < max_ticks:
         engine.step(dt, generals)
-        if not engine.get_units_for_player(1) or not engine.get_units_for_player(2):
+        if engine.is_finished:
             break
-    return len(engine.get_units_for_player(2))
+    return engine.alive_count(2)
 
 def generate_lanchester_plot(max_n=50):
     n_values = range(5, max_n + 1, 5)